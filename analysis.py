@@ -2,63 +2,114 @@
 
 Instructions:
 This Python module contains the evaluation method to find
-how well an AI player performs.
+how well an AI player performs. plotly is only needed by plot_data.
 
 Copyright and Usage Information:
 This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
 """
-import plotly.graph_objects as go
-import plotly
+import copy
+import multiprocessing
 from reversi_board import Reversi
+from reversi_bitboard import new_game
+from reversi_record import GameRecord, GameRecordWriter
 from reversi_player import Player, RandomPlayer, MiniMaxPlayer, \
     evaluate_score_by_piece, evaluate_score_by_position
 import random
 
-# The game simulate takes time to run
-# These are statics data of the result
-minimax_black_random_white = {'TOTAL': 10, 'BLACK PLAYER': 10, 'WHITE PLAYER': 0, 'TIE': 0}
-minimax_white_random_black = {'TOTAL': 10, 'BLACK PLAYER': 10, 'WHITE PLAYER': 0, 'TIE': 0}
 
-
-def get_performance(test_player: Player, n: int) -> float:
+def get_performance(test_player: Player, n: int, bitboard: bool = False,
+                    workers: int = 1, seed: int = 0, record: str = None) -> float:
     """simulate game for n times
     get the performance of the player
-    which is calculate by (win + (tie/2))/n"""
-    # result = {'BLACK PLAYER': 0, 'WHITE PLAYER': 0, 'TIE': 0}
+    which is calculate by (win + (tie/2))/n
+    the games use BitboardReversi iff bitboard, and are played by
+    workers processes, see run_matches"""
     result = {'random': 0, 'test_player': 0, 'tie': 0}
-    players = [RandomPlayer(Reversi()), test_player]
-    for i in range(n):
-        random.shuffle(players)
-        player_info = {'BLACK PLAYER': 'test_player', 'WHITE PLAYER': 'random', 'TIE': 'tie'}
-
-        if players[1] is test_player:
-            player_info['WHITE PLAYER'] = 'test_player'
-            player_info['BLACK PLAYER'] = 'random'
-
-        game = Reversi()
-        winner = run_one_simulate(game, players[0], players[1])
-        result[player_info[winner]] += 1
+    for i, (_, outcome) in enumerate(run_matches(test_player, n, bitboard, workers, seed,
+                                                 record)):
+        result[outcome] += 1
         print(f'{i + 1}', end='')
     return (result['test_player'] + result['tie'] / 2) / n
 
 
-def run_one_simulate(game: Reversi, black_player: Player, white_player: Player):
-    """simulate game once and return the winner"""
+def run_matches(test_player: Player, n: int, bitboard: bool = False,
+                workers: int = 1, seed: int = 0, record: str = None) -> any:
+    """simulate n games between test_player and a random player on workers
+    processes (None for the number of cores), and yield
+    (game index, 'test_player' or 'random' or 'tie') as the games finish.
+
+    Game i is played by a fresh copy of test_player with the random module
+    seeded by seed and i, so the results do not depend on workers.
+    If record is a path, the games are appended to it as they finish,
+    see reversi_record.
+    """
+    tasks = [(test_player, bitboard, seed, i) for i in range(n)]
+    writer = None if record is None else GameRecordWriter(record)
+    pool = None
+    try:
+        if workers == 1:
+            results = map(play_seeded_game, tasks)
+        else:
+            pool = multiprocessing.Pool(workers)
+            results = pool.imap_unordered(play_seeded_game, tasks)
+        for index, outcome, game_record in results:
+            if writer is not None:
+                writer.write(game_record)
+            yield index, outcome
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if writer is not None:
+            writer.close()
+
+
+def play_seeded_game(task: tuple) -> tuple[int, str, GameRecord]:
+    """play game index with a copy of test_player and the seed of the game,
+    return the index, the result for test_player and the record of the game"""
+    test_player, bitboard, seed, index = task
+    random.seed(f'{seed}:{index}')
+    test_player = copy.deepcopy(test_player)
+    players = [RandomPlayer(Reversi()), test_player]
+    random.shuffle(players)
+    player_info = {'BLACK PLAYER': 'test_player', 'WHITE PLAYER': 'random', 'TIE': 'tie'}
+
+    if players[1] is test_player:
+        player_info['WHITE PLAYER'] = 'test_player'
+        player_info['BLACK PLAYER'] = 'random'
+
+    game, moves = new_game(bitboard), []
+    try:
+        winner = run_one_simulate(game, players[0], players[1], moves)
+    finally:
+        test_player.close()
+    game_record = GameRecord.from_game(game, moves, type(players[0]).__name__,
+                                       type(players[1]).__name__, seed, index)
+    return index, player_info[winner], game_record
+
+
+def run_one_simulate(game: Reversi, black_player: Player, white_player: Player,
+                     moves: list = None):
+    """simulate game once and return the winner
+    the moves are appended to moves if it is given"""
     black_player.game = game
     white_player.game = game
     while game.winner() is None:
         if game.is_black_move:
-            game.make_move(black_player.think_move())
+            move = black_player.think_move()
         else:
-            game.make_move(white_player.think_move())
+            move = white_player.think_move()
+        game.make_move(move)
+        if moves is not None:
+            moves.append(move)
     return game.winner()
 
 
-def plot_data(depth: int, n: int) -> None:
+def plot_data(depth: int, n: int, workers: int = None, seed: int = 0) -> None:
     """
     plot the line graph to compare the performance
     of minimax players with two difference game score
     evaluation methods. n is the number of games
+    the games are played by workers processes (None for the number of cores)
     """
     depth = list(range(1, depth + 1))
     random_evaluate = []
@@ -67,13 +118,19 @@ def plot_data(depth: int, n: int) -> None:
     for d in depth:
         print(f'depth is {d}')
         random_player = RandomPlayer(Reversi())
-        simple_minimax = MiniMaxPlayer(Reversi(), d, 99, evaluate_score_by_piece)
-        complex_minimax = MiniMaxPlayer(Reversi(), d, 99, evaluate_score_by_position)
-
-        random_evaluate.append(get_performance(random_player, n))
-        simple_evaluate.append(get_performance(simple_minimax, n))
-        position_evaluate.append(get_performance(complex_minimax, n))
-
+        simple_minimax = MiniMaxPlayer(Reversi(), d, 99, evaluate_score_by_piece,
+                                       bitboard=True, search='alphabeta')
+        complex_minimax = MiniMaxPlayer(Reversi(), d, 99, evaluate_score_by_position,
+                                        bitboard=True, search='alphabeta')
+
+        random_evaluate.append(get_performance(random_player, n, True, workers, seed))
+        simple_evaluate.append(get_performance(simple_minimax, n, True, workers, seed))
+        position_evaluate.append(get_performance(complex_minimax, n, True, workers, seed))
+
+    # plotly is only imported to plot, so the simulations and the worker
+    # processes, which import this module, do not load it
+    import plotly
+    import plotly.graph_objects as go
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=depth, y=random_evaluate,
                              mode='lines+markers',
@@ -9,20 +9,23 @@ Analysis Mode: Human can make moves and see the live displayed
 Evaluation Mode: Plot and compare the performance score of
     simple minimax player and complex minimax player.
 
+With command line arguments, this module runs reversi_cli instead of
+the window, for example python main.py match position piece. tkinter,
+pygame and plotly are only imported when the window and the modes use them.
+
 Copyright and Usage Information:
 This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
 """
-from tkinter import ttk
-import tkinter as tk
+import sys
 from reversi_board import Reversi
-from reversi_pygame import run_game, analysis_game
 from reversi_player import RandomPlayer, MiniMaxPlayer, \
     evaluate_score_by_piece, evaluate_score_by_position
-from analysis import plot_data
+from reversi_mcts import MCTSPlayer
 
 
 def compare_performance() -> None:
     """plot performance"""
+    from analysis import plot_data
     n = menu4.get()
     depth = menu5.get()
     plot_data(int(depth), int(n))
@@ -30,6 +33,7 @@ def compare_performance() -> None:
 
 def start_analysis() -> None:
     """start analysis mode"""
+    from reversi_pygame import analysis_game
     game = Reversi()
     print('new game')
     analysis_game(game)
@@ -37,6 +41,7 @@ def start_analysis() -> None:
 
 def start_game() -> None:
     """start a new game"""
+    from reversi_pygame import run_game
     black_player = menu1.get()
     white_player = menu2.get()
     depth = int(menu3.get())
@@ -47,25 +52,40 @@ def start_game() -> None:
     if white_player == 'Random Computer':
         white_player = RandomPlayer(game)
     elif white_player == 'Simple Computer':
-        white_player = MiniMaxPlayer(game, depth, 99, evaluate_score_by_piece)
+        white_player = MiniMaxPlayer(game, depth, 99, evaluate_score_by_piece,
+                                     bitboard=True, search='alphabeta', endgame=12)
     elif white_player == 'Complex Computer':
-        white_player = MiniMaxPlayer(game, depth, 99, evaluate_score_by_position)
+        white_player = MiniMaxPlayer(game, depth, 99, evaluate_score_by_position,
+                                     bitboard=True, search='alphabeta', endgame=12)
+    elif white_player == 'MCTS Computer':
+        white_player = MCTSPlayer(game, 500 * depth)
     else:
         white_player = 'HUMAN'
 
     if black_player == 'Random Computer':
         black_player = RandomPlayer(game)
     elif black_player == 'Simple Computer':
-        black_player = MiniMaxPlayer(game, depth, 99, evaluate_score_by_piece)
+        black_player = MiniMaxPlayer(game, depth, 99, evaluate_score_by_piece,
+                                     bitboard=True, search='alphabeta', endgame=12)
     elif black_player == 'Complex Computer':
-        black_player = MiniMaxPlayer(game, depth, 99, evaluate_score_by_position)
+        black_player = MiniMaxPlayer(game, depth, 99, evaluate_score_by_position,
+                                     bitboard=True, search='alphabeta', endgame=12)
+    elif black_player == 'MCTS Computer':
+        black_player = MCTSPlayer(game, 500 * depth)
     else:
         black_player = 'HUMAN'
 
     run_game(game, black_player, white_player, player_info=info)
 
 
+if __name__ == '__main__' and len(sys.argv) > 1:
+    from reversi_cli import main
+    sys.exit(main())
+
 if __name__ == '__main__':
+    from tkinter import ttk
+    import tkinter as tk
+
     # initialize the window
     window = tk.Tk()
     window.title('My Window')
@@ -84,19 +104,23 @@ if __name__ == '__main__':
     tk.Label(vs_mode, text='VS Mode', bg='green').pack()
     tk.Label(vs_mode, text='select black player').pack()
     menu1 = ttk.Combobox(vs_mode)
-    menu1['value'] = ('Human', 'Random Computer', 'Simple Computer', 'Complex Computer')
+    menu1['value'] = ('Human', 'Random Computer', 'Simple Computer', 'Complex Computer',
+                      'MCTS Computer')
     menu1.current(0)
     menu1.pack()
     tk.Label(vs_mode, text='select white player').pack()
     menu2 = ttk.Combobox(vs_mode)
-    menu2['value'] = ('Human', 'Random Computer', 'Simple Computer', 'Complex Computer')
+    menu2['value'] = ('Human', 'Random Computer', 'Simple Computer', 'Complex Computer',
+                      'MCTS Computer')
     menu2.current(3)
     menu2.pack()
     tk.Label(vs_mode, text='select the depth of the game tree'
                            '\nif computer player exist notice \n'
-                           'depth 5 takes very long time').pack()
+                           'depth 8 takes very long time\n'
+                           'MCTS computer plays 500 * depth\n'
+                           'random games for each move').pack()
     menu3 = ttk.Combobox(vs_mode)
-    menu3['value'] = ('1', '2', '3', '4', '5')
+    menu3['value'] = ('1', '2', '3', '4', '5', '6', '7', '8')
     menu3.current(2)
     menu3.pack()
     button1 = tk.Button(vs_mode, text='start game', width=15, height=2, command=start_game)
@@ -0,0 +1,185 @@
+"""CSC111 Final Project: AI Player for Reversi
+
+Instructions:
+This Python module contains the batched versions of the evaluation
+functions in reversi_player. A batch of N boards is either an (N, 8, 8)
+array of pieces, like Reversi.board, or an (N, 2) array of the black and
+white bitboards of BitboardReversi, and all of them are scored with one
+vectorised dot product against WEIGHT.
+
+This module needs numpy.
+
+Copyright and Usage Information:
+This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
+"""
+import numpy as np
+from reversi_board import Reversi, BLACK_PIECE, WHITE_PIECE
+from reversi_bitboard import BitboardReversi, DIRECTIONS, find_flips
+from reversi_player import WEIGHT, MOBILITY_WEIGHT, evaluate_score_by_piece, \
+    evaluate_score_by_position
+
+WEIGHT_ARRAY = np.array(WEIGHT, dtype=np.int64)
+ONES_ARRAY = np.ones((8, 8), dtype=np.int64)
+
+
+def piece_difference(boards: np.ndarray) -> np.ndarray:
+    """return the (N, 8, 8) array which is 1 for black pieces, -1 for white
+    pieces and 0 for empty squares of the batch of boards"""
+    boards = np.asarray(boards)
+    if boards.ndim == 3:
+        return (boards == BLACK_PIECE).astype(np.int64) - (boards == WHITE_PIECE)
+    bits = np.unpackbits(boards.astype('<u8').view(np.uint8).reshape(-1, 2, 8),
+                         axis=2, bitorder='little').astype(np.int64)
+    return (bits[:, 0] - bits[:, 1]).reshape(-1, 8, 8)
+
+
+def evaluate_batch(boards: np.ndarray, for_black: any, weight: np.ndarray) -> np.ndarray:
+    """return the weighted score difference of each board,
+    for black player where for_black is true, which is a bool or an array of N bools"""
+    scores = np.tensordot(piece_difference(boards), weight, axes=2)
+    return np.where(for_black, scores, -scores)
+
+
+def evaluate_batch_by_piece(boards: np.ndarray, for_black: any) -> np.ndarray:
+    """the batched version of evaluate_score_by_piece"""
+    return evaluate_batch(boards, for_black, ONES_ARRAY)
+
+
+def evaluate_batch_by_position(boards: np.ndarray, for_black: any) -> np.ndarray:
+    """the batched version of evaluate_score_by_position"""
+    return evaluate_batch(boards, for_black, WEIGHT_ARRAY)
+
+
+# the batched versions of the evaluation functions, evaluate_score_by_position
+# has none if it has a mobility term
+BATCH_EVALUATORS = {evaluate_score_by_piece: evaluate_batch_by_piece}
+if not MOBILITY_WEIGHT:
+    BATCH_EVALUATORS[evaluate_score_by_position] = evaluate_batch_by_position
+
+
+def board_of(game: Reversi) -> any:
+    """return a copy of the board of game in the batch format"""
+    if isinstance(game, BitboardReversi):
+        return game.black, game.white
+    return game.board
+
+
+def board_after(game: Reversi, move: tuple) -> any:
+    """return the board after the current player of game makes move in the
+    batch format, without changing game or finding the valid moves after it"""
+    row, column = move
+    if isinstance(game, BitboardReversi):
+        own, opponent = game.own_and_opponent()
+        flips = find_flips(row * 8 + column, own, opponent)
+        own, opponent = own | flips | (1 << (row * 8 + column)), opponent ^ flips
+        return (own, opponent) if game.is_black_move else (opponent, own)
+    board = game.board
+    piece = game.next_piece()
+    board[row][column] = piece
+    for r, c in game.get_flips(row, column):
+        board[r][c] = piece
+    return board
+
+
+def make_batch(boards: list) -> np.ndarray:
+    """return the batch of boards returned by board_of"""
+    if boards and isinstance(boards[0], tuple):
+        return np.array(boards, dtype=np.uint64)
+    return np.array(boards, dtype=np.int8)
+
+
+def shift_batch(bits: np.ndarray, n: int) -> np.ndarray:
+    """shift the bitboards to the left if n > 0, otherwise to the right"""
+    if n > 0:
+        return bits << np.uint64(n)
+    return bits >> np.uint64(-n)
+
+
+def find_moves_batch(own: np.ndarray, opponent: np.ndarray) -> np.ndarray:
+    """the batched version of reversi_bitboard.find_moves"""
+    empty = ~(own | opponent)
+    moves = np.zeros_like(own)
+    for n, mask in DIRECTIONS:
+        mask = np.uint64(mask)
+        opp = opponent & mask
+        x = shift_batch(own, n) & opp
+        for _ in range(5):
+            x |= shift_batch(x, n) & opp
+        moves |= shift_batch(x, n) & mask & empty
+    return moves
+
+
+def find_flips_batch(bits: np.ndarray, own: np.ndarray, opponent: np.ndarray) -> np.ndarray:
+    """return the pieces reversed by a new piece of own at the single bit of bits"""
+    flips = np.zeros_like(own)
+    for n, mask in DIRECTIONS:
+        mask = np.uint64(mask)
+        opp = opponent & mask
+        line = shift_batch(bits, n) & opp
+        for _ in range(5):
+            line |= shift_batch(line, n) & opp
+        bounded = (shift_batch(line, n) & mask & own) != 0
+        flips |= np.where(bounded, line, np.uint64(0))
+    return flips
+
+
+def count_bits(bits: np.ndarray) -> np.ndarray:
+    """return the number of set bits of each bitboard"""
+    return np.unpackbits(bits.astype('<u8').view(np.uint8).reshape(-1, 8),
+                         axis=1).sum(axis=1)
+
+
+def simulate_random_games(n: int, seed: int = None, record: bool = False) -> dict:
+    """simulate n games between two random players at once,
+    the same as analysis.run_one_simulate with two RandomPlayer.
+
+    Return a dict with the number of games won by 'BLACK PLAYER', 'WHITE PLAYER'
+    and 'TIE', the final 'black_score' and 'white_score' arrays, and if record,
+    the (n, 60) array 'moves' of the squares row * 8 + column played in each game,
+    padded with -1.
+    """
+    rng = np.random.default_rng(seed)
+    black = np.full(n, (1 << 27) | (1 << 36), dtype=np.uint64)
+    white = np.full(n, (1 << 28) | (1 << 35), dtype=np.uint64)
+    is_black_move = np.ones(n, dtype=bool)
+    playing = np.ones(n, dtype=bool)
+    moves_record = np.full((n, 60), -1, dtype=np.int8) if record else None
+    squares = np.arange(64, dtype=np.uint64)
+
+    for ply in range(60):
+        own = np.where(is_black_move, black, white)
+        opponent = np.where(is_black_move, white, black)
+        moves = find_moves_batch(own, opponent)
+        playing &= moves != 0
+        if not playing.any():
+            break
+        # a random valid move is the valid square with the largest random number
+        valid = ((moves[:, None] >> squares) & np.uint64(1)).astype(bool)
+        choice = np.where(valid, rng.random((n, 64)), -1.0).argmax(axis=1)
+        bits = np.where(playing, np.uint64(1) << choice.astype(np.uint64), np.uint64(0))
+        flips = find_flips_batch(bits, own, opponent)
+        own = own | flips | bits
+        opponent = opponent ^ flips
+        black = np.where(is_black_move, own, opponent)
+        white = np.where(is_black_move, opponent, own)
+        if record:
+            moves_record[playing, ply] = choice[playing]
+        is_black_move = np.where(playing, ~is_black_move, is_black_move)
+
+    black_score, white_score = count_bits(black), count_bits(white)
+    result = {'BLACK PLAYER': int((black_score > white_score).sum()),
+              'WHITE PLAYER': int((black_score < white_score).sum()),
+              'TIE': int((black_score == white_score).sum()),
+              'black_score': black_score,
+              'white_score': white_score}
+    if record:
+        result['moves'] = moves_record
+    return result
+
+
+if __name__ == '__main__':
+    game = Reversi()
+    game.make_move((2, 4))
+    print(evaluate_batch_by_position(make_batch([board_of(game)]), True),
+          evaluate_batch_by_position(make_batch([board_of(BitboardReversi.from_game(game))]), True),
+          evaluate_score_by_position(game, True))
@@ -0,0 +1,197 @@
+"""CSC111 Final Project: AI Player for Reversi
+
+Instructions:
+This Python module measures the speed of the engine, with three parts:
+    - perft: the number of positions after depth moves from the start
+        position and from the test positions, and the time to count them
+    - search: the time and the number of positions searched by
+        MiniMaxPlayer for each depth and evaluation function
+    - self-play: the number of games per second of a fixed match
+The results are saved to a JSON file and compared with a baseline file,
+and a result slower than the baseline by more than the threshold is a
+regression. A different perft count is always a regression.
+
+Run this module from the command line, for example
+    python reversi_benchmark.py --output bench.json --baseline baseline.json
+
+Copyright and Usage Information:
+This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from reversi_board import Reversi
+from reversi_bitboard import BitboardReversi
+from reversi_player import MiniMaxPlayer, RandomPlayer, AlphaBetaSearch, \
+    evaluate_score_by_piece, evaluate_score_by_position, generate_game_tree
+
+BOARDS = {'list': Reversi, 'bitboard': BitboardReversi}
+EVALUATORS = {'piece': evaluate_score_by_piece, 'position': evaluate_score_by_position}
+
+# the test positions, given by the moves from the start position
+TEST_POSITIONS = {
+    'start': [],
+    'opening': [(4, 2), (5, 4), (4, 5), (3, 2), (6, 3), (5, 2)],
+    'middle': [(4, 2), (3, 2), (2, 4), (5, 4), (2, 2), (1, 4), (5, 5), (2, 1),
+               (2, 0), (1, 0), (3, 5), (3, 0), (0, 4), (2, 3)],
+}
+
+
+def make_position(board: type, moves: list[tuple]) -> Reversi:
+    """return the game of board type after moves from the start position"""
+    game = board()
+    for move in moves:
+        game.make_move(move)
+    return game
+
+
+def perft(game: Reversi, depth: int) -> int:
+    """return the number of positions after depth moves from game,
+    the games which end earlier are not counted"""
+    if depth == 0:
+        return 1
+    if depth == 1:
+        return len(game.valid_moves)
+    total = 0
+    for move in game.valid_moves:
+        game.push(move)
+        total += perft(game, depth - 1)
+        game.pop()
+    return total
+
+
+def run_perft(depth: int) -> dict:
+    """return the perft counts and times of the test positions on each board"""
+    results = {}
+    for board_name, board in BOARDS.items():
+        for position, moves in TEST_POSITIONS.items():
+            game = make_position(board, moves)
+            start_time = time.perf_counter()
+            count = perft(game, depth)
+            results[f'{board_name}/{position}'] = {'depth': depth, 'count': count,
+                                                   'time': time.perf_counter() - start_time}
+    return results
+
+
+def run_search(max_depth: int) -> dict:
+    """return the time and the number of searched positions of the 'alphabeta'
+    and 'minimax' searches of MiniMaxPlayer on the middle test position,
+    for each evaluation function and depth"""
+    results = {}
+    game = make_position(Reversi, TEST_POSITIONS['middle'])
+    for name, evaluate in EVALUATORS.items():
+        for depth in range(1, max_depth + 1):
+            searcher = AlphaBetaSearch(game.is_black_move, evaluate)
+            start_time = time.perf_counter()
+            searcher.search_root(BitboardReversi.from_game(game), depth)
+            results[f'alphabeta/{name}/{depth}'] = {'time': time.perf_counter() - start_time,
+                                                    'nodes': searcher.nodes}
+        for depth in range(1, min(max_depth, 3) + 1):
+            start_time = time.perf_counter()
+            tree = generate_game_tree('*', BitboardReversi.from_game(game), depth, time.time(),
+                                      99, game.is_black_move, evaluate)
+            results[f'minimax/{name}/{depth}'] = {'time': time.perf_counter() - start_time,
+                                                  'nodes': count_nodes(tree)}
+    return results
+
+
+def count_nodes(tree: any) -> int:
+    """return the number of nodes of a game tree"""
+    return 1 + sum(count_nodes(s) for s in tree.sub_trees)
+
+
+def run_self_play(games: int, seed: int = 0) -> dict:
+    """return the games per second of random players on each board, and of a
+    depth 1 MiniMaxPlayer against a random player on bitboards"""
+    results = {}
+    for board_name, board in BOARDS.items():
+        random.seed(seed)
+        start_time = time.perf_counter()
+        for _ in range(games):
+            play(board(), RandomPlayer(None), RandomPlayer(None))
+        elapsed = time.perf_counter() - start_time
+        results[f'random/{board_name}'] = {'time': elapsed, 'games_per_second': games / elapsed}
+    random.seed(seed)
+    start_time = time.perf_counter()
+    for _ in range(games):
+        minimax = MiniMaxPlayer(None, 1, 99, evaluate_score_by_position, search='alphabeta')
+        play(BitboardReversi(), minimax, RandomPlayer(None))
+    elapsed = time.perf_counter() - start_time
+    results['minimax1/bitboard'] = {'time': elapsed, 'games_per_second': games / elapsed}
+    return results
+
+
+def play(game: Reversi, black_player: any, white_player: any) -> str:
+    """play game to the end and return the winner"""
+    black_player.game = game
+    white_player.game = game
+    while game.winner() is None:
+        player = black_player if game.is_black_move else white_player
+        game.make_move(player.think_move())
+    return game.winner()
+
+
+def run_benchmark(perft_depth: int = 4, search_depth: int = 5, games: int = 20) -> dict:
+    """return the results of all parts of the benchmark"""
+    return {'perft': run_perft(perft_depth),
+            'search': run_search(search_depth),
+            'self_play': run_self_play(games)}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """return the descriptions of the regressions of results from baseline,
+    a time longer than the baseline time by more than threshold (0.1 for 10%)
+    or a different perft count or number of searched positions"""
+    regressions = []
+    for part, part_results in results.items():
+        for name, result in part_results.items():
+            old = baseline.get(part, {}).get(name)
+            if old is None:
+                continue
+            for key in ('count', 'nodes'):
+                if key in old and old[key] != result[key]:
+                    regressions.append(f'{part} {name}: {key} {result[key]} != {old[key]}')
+            if result['time'] > old['time'] * (1 + threshold):
+                regressions.append(f'{part} {name}: time {result["time"]:.3f}s '
+                                   f'> {old["time"]:.3f}s + {threshold:.0%}')
+    return regressions
+
+
+def main(argv: list[str] = None) -> int:
+    """run the benchmark from the command line, return 1 iff there is a regression"""
+    parser = argparse.ArgumentParser(description='Benchmark the Reversi engine')
+    parser.add_argument('--output', default='benchmark.json', help='the result file')
+    parser.add_argument('--baseline', help='the baseline file to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='the allowed slowdown from the baseline, 0.1 for 10%%')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='also save the results as the baseline file')
+    parser.add_argument('--perft-depth', type=int, default=4)
+    parser.add_argument('--search-depth', type=int, default=5)
+    parser.add_argument('--games', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.perft_depth, args.search_depth, args.games)
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f'results are saved to {args.output}')
+
+    if args.baseline is None:
+        return 0
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        print(f'baseline is saved to {args.baseline}')
+        return 0
+    with open(args.baseline) as baseline_file:
+        regressions = compare(results, json.load(baseline_file), args.threshold)
+    for regression in regressions:
+        print('REGRESSION', regression)
+    print(f'{len(regressions)} regressions')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
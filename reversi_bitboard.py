@@ -0,0 +1,296 @@
+"""CSC111 Final Project: AI Player for Reversi
+
+Instructions:
+This Python module contains a bitboard version of the Reversi game.
+The position is stored as two 64-bit integers, one per colour, where
+square (row, column) is bit row * 8 + column. Valid moves are found with
+shift-and-mask flood fills and scores are counted with popcount.
+
+BitboardReversi has the same interface as reversi_board.Reversi, so the
+players and the simulations can use either of them.
+
+Copyright and Usage Information:
+This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
+"""
+from reversi_board import Reversi, BLACK_PIECE, WHITE_PIECE, EMPTY_PIECE, \
+    ZOBRIST, ZOBRIST_BLACK_MOVE
+
+FULL_MASK = 0xFFFFFFFFFFFFFFFF
+NOT_A_FILE = 0xFEFEFEFEFEFEFEFE  # every square except column 0
+NOT_H_FILE = 0x7F7F7F7F7F7F7F7F  # every square except column 7
+
+# (shift, mask) for each of the 8 directions, positive shift is a left shift.
+# the mask removes the squares that wrapped around the edge of the board
+DIRECTIONS = [(1, NOT_A_FILE), (-1, NOT_H_FILE),
+              (8, FULL_MASK), (-8, FULL_MASK),
+              (9, NOT_A_FILE), (7, NOT_H_FILE),
+              (-7, NOT_A_FILE), (-9, NOT_H_FILE)]
+
+SQUARES = [(row, column) for row in range(8) for column in range(8)]
+
+
+def shift(bits: int, n: int) -> int:
+    """shift the bits to the left if n > 0, otherwise to the right"""
+    if n > 0:
+        return (bits << n) & FULL_MASK
+    return bits >> -n
+
+
+def find_moves(own: int, opponent: int) -> int:
+    """return the bitboard of all valid moves for the player owning own"""
+    empty = ~(own | opponent) & FULL_MASK
+    moves = 0
+    for n, mask in DIRECTIONS:
+        opp = opponent & mask
+        if n > 0:
+            x = (own << n) & opp
+            x |= (x << n) & opp
+            x |= (x << n) & opp
+            x |= (x << n) & opp
+            x |= (x << n) & opp
+            x |= (x << n) & opp
+            moves |= (x << n) & mask & empty
+        else:
+            n = -n
+            x = (own >> n) & opp
+            x |= (x >> n) & opp
+            x |= (x >> n) & opp
+            x |= (x >> n) & opp
+            x |= (x >> n) & opp
+            x |= (x >> n) & opp
+            moves |= (x >> n) & mask & empty
+    return moves
+
+
+def find_flips(square: int, own: int, opponent: int) -> int:
+    """return the bitboard of the pieces reversed by a new piece of own at square"""
+    flips = 0
+    bit = 1 << square
+    for n, mask in DIRECTIONS:
+        line = 0
+        x = shift(bit, n) & mask
+        while x & opponent:
+            line |= x
+            x = shift(x, n) & mask
+        if x & own:
+            flips |= line
+    return flips
+
+
+def bits_to_squares(bits: int) -> list[int]:
+    """return the squares of the set bits in increasing order"""
+    squares = []
+    while bits:
+        low = bits & -bits
+        squares.append(low.bit_length() - 1)
+        bits ^= low
+    return squares
+
+
+class BitboardReversi:
+    """The class represents a Reversi game stored as bitboards
+
+    Instance Attributes:
+        - black: the bitboard of BLACK_PIECE
+        - white: the bitboard of WHITE_PIECE
+        - valid_moves: the list of valid moves of current player
+        - is_black_move: true iff current player is black player
+        - white_score: the number of WHITE_PIECE on the board
+        - black_score: the number of BLACK_PIECE on the board
+        - move_stack: the moves made by self.push with the information
+            to undo them by self.pop
+        - hash: the Zobrist hash of the board and the current player,
+            equal to the hash of reversi_board.Reversi with the same position
+        - term_weights: the incremental evaluation terms of the game, see
+            reversi_board.make_term, which the evaluation functions count
+            from the bitboards themselves
+    """
+    black: int
+    white: int
+    valid_moves: list[tuple]
+    is_black_move: bool
+    white_score: int
+    black_score: int
+    move_stack: list[tuple]
+    hash: int
+    term_weights: tuple
+
+    def __init__(self, board=None, is_black_move=True, term_weights: tuple = ()) -> None:
+        """Initialize the bitboards from a nested list board"""
+        self.black, self.white = 0, 0
+        if board is None:
+            self.black = (1 << 27) | (1 << 36)
+            self.white = (1 << 28) | (1 << 35)
+        else:
+            for row in range(8):
+                for column in range(8):
+                    if board[row][column] == BLACK_PIECE:
+                        self.black |= 1 << (row * 8 + column)
+                    elif board[row][column] == WHITE_PIECE:
+                        self.white |= 1 << (row * 8 + column)
+        self.is_black_move = is_black_move
+        self.move_stack = []
+        self.hash = self.compute_hash()
+        self.valid_moves = self.get_valid_moves()
+        self.update_score()
+        self.term_weights = term_weights
+
+    @classmethod
+    def from_game(cls, game: any) -> any:
+        """Return a BitboardReversi with the same position as game"""
+        if isinstance(game, BitboardReversi):
+            return game.copy_board()
+        return cls(game.board, game.is_black_move, game.term_weights)
+
+    @property
+    def board(self) -> list[list[int]]:
+        """the nested list representation of the board"""
+        board = [[EMPTY_PIECE] * 8 for _ in range(8)]
+        for square in bits_to_squares(self.black):
+            board[square // 8][square % 8] = BLACK_PIECE
+        for square in bits_to_squares(self.white):
+            board[square // 8][square % 8] = WHITE_PIECE
+        return board
+
+    def own_and_opponent(self) -> tuple[int, int]:
+        """return the bitboards of current player and the other player"""
+        if self.is_black_move:
+            return self.black, self.white
+        return self.white, self.black
+
+    def winner(self) -> any:
+        """return None is game is not end, otherwise return the winner"""
+        if self.valid_moves == []:
+            if self.black_score > self.white_score:
+                return 'BLACK PLAYER'
+            if self.black_score < self.white_score:
+                return 'WHITE PLAYER'
+            return 'TIE'
+        return None
+
+    def compute_hash(self) -> int:
+        """return the Zobrist hash of the board and the current player"""
+        h = ZOBRIST_BLACK_MOVE if self.is_black_move else 0
+        for square in range(64):
+            h ^= ZOBRIST[square][EMPTY_PIECE]
+        for square in bits_to_squares(self.black):
+            h ^= ZOBRIST[square][BLACK_PIECE]
+        for square in bits_to_squares(self.white):
+            h ^= ZOBRIST[square][WHITE_PIECE]
+        return h
+
+    def update_score(self) -> None:
+        """update the scores"""
+        self.black_score = self.black.bit_count()
+        self.white_score = self.white.bit_count()
+
+    def get_valid_moves(self) -> list[tuple]:
+        """return valid moves"""
+        return [SQUARES[s] for s in bits_to_squares(find_moves(*self.own_and_opponent()))]
+
+    def make_move(self, move: tuple) -> None:
+        """make move and update valid moves"""
+        if move not in self.valid_moves:
+            raise ValueError
+        self.update_board(move[0], move[1])
+        self.update_score()
+        self.is_black_move = not self.is_black_move
+        self.hash ^= ZOBRIST_BLACK_MOVE
+        self.valid_moves = self.get_valid_moves()
+
+    def push(self, move: tuple) -> None:
+        """make move in place and remember how to undo it with self.pop"""
+        if move not in self.valid_moves:
+            raise ValueError
+        self.move_stack.append((move, self.black, self.white, self.valid_moves,
+                                self.black_score, self.white_score, self.hash))
+        self.update_board(move[0], move[1])
+        self.update_score()
+        self.is_black_move = not self.is_black_move
+        self.hash ^= ZOBRIST_BLACK_MOVE
+        self.valid_moves = self.get_valid_moves()
+
+    def pop(self) -> tuple:
+        """undo the last move made by self.push and return it"""
+        (move, self.black, self.white, self.valid_moves,
+         self.black_score, self.white_score, self.hash) = self.move_stack.pop()
+        self.is_black_move = not self.is_black_move
+        return move
+
+    def mobility(self, is_black_move: bool = None) -> int:
+        """return the number of valid moves of black player if is_black_move,
+        otherwise of white player, or of the current player if it is None"""
+        if is_black_move is None or is_black_move == self.is_black_move:
+            return len(self.valid_moves)
+        if is_black_move:
+            return find_moves(self.black, self.white).bit_count()
+        return find_moves(self.white, self.black).bit_count()
+
+    def is_valid_move(self, row, column) -> bool:
+        """return true iff the move is at empty grid
+         and reverse at least one piece"""
+        return bool(find_moves(*self.own_and_opponent()) & (1 << (row * 8 + column)))
+
+    def update_board(self, row: int, column: int, for_test: bool = False) -> int:
+        """place a new piece then update board and return the number of piece change"""
+        square = row * 8 + column
+        if (self.black | self.white) >> square & 1:
+            return 0
+        own, opponent = self.own_and_opponent()
+        flips = find_flips(square, own, opponent)
+        if not for_test:
+            own |= flips | (1 << square)
+            opponent ^= flips
+            if self.is_black_move:
+                self.black, self.white = own, opponent
+                piece, opponent_piece = BLACK_PIECE, WHITE_PIECE
+            else:
+                self.white, self.black = own, opponent
+                piece, opponent_piece = WHITE_PIECE, BLACK_PIECE
+            h = self.hash ^ ZOBRIST[square][EMPTY_PIECE] ^ ZOBRIST[square][piece]
+            for s in bits_to_squares(flips):
+                h ^= ZOBRIST[s][opponent_piece] ^ ZOBRIST[s][piece]
+            self.hash = h
+        return flips.bit_count()
+
+    def copy_board(self, is_black_move=None, term_weights: tuple = None) -> any:
+        """Return the game with same board, and the same terms unless
+        term_weights is given"""
+        game = BitboardReversi.__new__(BitboardReversi)
+        game.term_weights = self.term_weights if term_weights is None else term_weights
+        game.black, game.white = self.black, self.white
+        game.move_stack = []
+        game.hash = self.hash
+        game.black_score, game.white_score = self.black_score, self.white_score
+        if is_black_move is None or is_black_move == self.is_black_move:
+            game.is_black_move = self.is_black_move
+            game.valid_moves = list(self.valid_moves)
+        else:
+            game.is_black_move = is_black_move
+            game.hash ^= ZOBRIST_BLACK_MOVE
+            game.valid_moves = game.get_valid_moves()
+        return game
+
+    def next_piece(self) -> any:
+        """Return the piece of next player"""
+        if self.is_black_move:
+            return BLACK_PIECE
+        return WHITE_PIECE
+
+
+def new_game(bitboard: bool = False) -> any:
+    """Return a new game which uses the bitboard version iff bitboard"""
+    if bitboard:
+        return BitboardReversi()
+    return Reversi()
+
+
+if __name__ == '__main__':
+    from pprint import pprint
+    r = BitboardReversi()
+    print('this is the initial board')
+    pprint(r.board)
+    print('valid move for black is', r.valid_moves)
+    r.make_move((2, 4))
+    pprint(r.board)
+    print(f'black score is {r.black_score}, white score is {r.white_score}')
@@ -6,42 +6,109 @@ This Python module contains the game board and rules of Reversi
 Copyright and Usage Information:
 This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
 """
-import copy
+import random
 
 BLACK_PIECE = 2
 WHITE_PIECE = 1
 EMPTY_PIECE = 0
 
+# Zobrist keys, ZOBRIST[row * 8 + column][piece] is xor-ed into the hash of a
+# board with piece at (row, column), and ZOBRIST_BLACK_MOVE when black moves next.
+# The fixed seed gives the same hash in every process.
+_zobrist_random = random.Random(111)
+ZOBRIST = [[0] + [_zobrist_random.getrandbits(64) for _ in range(2)] for _ in range(64)]
+ZOBRIST_BLACK_MOVE = _zobrist_random.getrandbits(64)
+
+SQUARES = [(row, column) for row in range(8) for column in range(8)]
+
+# RAYS[row * 8 + column] is the list of the rays from (row, column) in the 8
+# directions, each ray is the tuple of the squares row * 8 + column from the
+# nearest one to the edge of the board, rays of no square are left out
+RAYS = [[ray for ray in (tuple((row + dr * k) * 8 + column + dc * k
+                               for k in range(1, 8)
+                               if 0 <= row + dr * k <= 7 and 0 <= column + dc * k <= 7)
+                         for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1),
+                                        (1, 1), (1, -1), (-1, 1), (-1, -1)))
+         if ray]
+        for row in range(8) for column in range(8)]
+
+# the rays of at least two squares, the only ones where pieces can be reversed
+FLIP_RAYS = [[ray for ray in rays if len(ray) >= 2] for rays in RAYS]
+
+# NEIGHBOURS[row * 8 + column] is the list of squares next to (row, column)
+NEIGHBOURS = [[(row + dr) * 8 + column + dc
+               for dr in (-1, 0, 1) for dc in (-1, 0, 1)
+               if (dr, dc) != (0, 0) and 0 <= row + dr <= 7 and 0 <= column + dc <= 7]
+              for row in range(8) for column in range(8)]
+
+
+def make_term(weight: list[list[int]]) -> tuple[int]:
+    """return the weights by square row * 8 + column of an incremental
+    evaluation term, the sum of weight[row][column] of the black pieces minus
+    that of the white pieces. A game given a tuple of terms keeps their values
+    up to date in Reversi.terms, see Reversi.__init__"""
+    return tuple(weight[row][column] for row in range(8) for column in range(8))
+
 
 class Reversi:
     """The class represents a Reversi game
 
     Instance Attributes:
-        - board: the nest list represent the game board, the elements
-            are WHITE_PIECE, BLACK_PIECE, and EMPTY_PIECE.
+        - cells: the flat list of the 64 squares of the board, square
+            (row, column) is cells[row * 8 + column], the elements are
+            WHITE_PIECE, BLACK_PIECE, and EMPTY_PIECE.
+        - board: the nest list represent the game board, a new copy of
+            self.cells on every access
         - valid_moves: the list of valid moves of current player
         - is_black_move: true iff current player is black player
         - white_score: the number of WHITE_PIECE in self.board
         - black_score: the number of BLACK_PIECE on self.board
+        - move_stack: the moves made by self.push with the information
+            to undo them by self.pop
+        - hash: the Zobrist hash of the board and the current player,
+            updated whenever a move is made
+        - term_weights: the incremental evaluation terms of the game, see
+            make_term. They belong to the game, so a game only pays for the
+            terms of the evaluation function which searches it.
+        - terms: the values of self.term_weights for black player, in the
+            same order, updated whenever a move is made
+        - frontier: the empty squares row * 8 + column next to a piece, which
+            are the only squares where a move can be valid, updated whenever
+            a move is made
     """
-    board: list[list[any]]
+    cells: list[int]
     valid_moves: list[tuple]
     is_black_move: bool
     white_score: int
     black_score: int
+    move_stack: list[tuple]
+    hash: int
+    term_weights: tuple
+    terms: tuple[int]
+    frontier: set[int]
 
-    def __init__(self, board=None, is_black_move=True) -> None:
-        """Initialize the board, update the valid_moves iff not for testing
-        to avoid recursion error"""
+    def __init__(self, board=None, is_black_move=True, term_weights: tuple = ()) -> None:
+        """Initialize the game from a nested list board, or the start position,
+        with the incremental evaluation terms term_weights"""
         if board is None:
-            board = [[EMPTY_PIECE] * 8 for _ in range(8)]
-            board[3][3], board[4][4], board[3][4], board[4][3] = \
+            self.cells = [EMPTY_PIECE] * 64
+            self.cells[27], self.cells[36], self.cells[28], self.cells[35] = \
                 BLACK_PIECE, BLACK_PIECE, WHITE_PIECE, WHITE_PIECE
-        self.board = board
+        else:
+            self.cells = [board[row][column] for row in range(8) for column in range(8)]
         self.is_black_move = is_black_move
-        self.valid_moves = []
+        self.move_stack = []
+        self.hash = self.compute_hash()
+        self.frontier = self.compute_frontier()
         self.valid_moves = self.get_valid_moves()
         self.update_score()
+        self.term_weights = term_weights
+        self.terms = self.compute_terms()
+
+    @property
+    def board(self) -> list[list[int]]:
+        """the nested list representation of the board"""
+        return [self.cells[row * 8:row * 8 + 8] for row in range(8)]
 
     def winner(self) -> any:
         """return None is game is not end, otherwise return the winner"""
@@ -53,76 +120,185 @@ class Reversi:
             return 'TIE'
         return None
 
+    def compute_hash(self) -> int:
+        """return the Zobrist hash of the board and the current player"""
+        h = ZOBRIST_BLACK_MOVE if self.is_black_move else 0
+        for square, piece in enumerate(self.cells):
+            h ^= ZOBRIST[square][piece]
+        return h
+
+    def compute_frontier(self) -> set[int]:
+        """return the empty squares next to a piece"""
+        cells = self.cells
+        return {square for square in range(64)
+                if cells[square] == EMPTY_PIECE
+                and any(cells[s] != EMPTY_PIECE for s in NEIGHBOURS[square])}
+
+    def compute_terms(self) -> tuple[int]:
+        """return the values of the evaluation terms for black player"""
+        terms = []
+        for weight in self.term_weights:
+            value = 0
+            for square, piece in enumerate(self.cells):
+                if piece == BLACK_PIECE:
+                    value += weight[square]
+                elif piece == WHITE_PIECE:
+                    value -= weight[square]
+            terms.append(value)
+        return tuple(terms)
+
     def update_score(self) -> None:
-        """update the scores"""
-        self.white_score = len([0 for row in range(8) for column in range(8) if
-                                self.board[row][column] == WHITE_PIECE])
-        self.black_score = len([0 for row in range(8) for column in range(8) if
-                                self.board[row][column] == BLACK_PIECE])
+        """count the scores of the whole board, moves update them incrementally"""
+        self.white_score = self.cells.count(WHITE_PIECE)
+        self.black_score = self.cells.count(BLACK_PIECE)
 
     def get_valid_moves(self) -> list[tuple]:
-        """return valid moves"""
-        valid_moves = []
-        for row in range(8):
-            for column in range(8):
-                if self.is_valid_move(row, column):
-                    valid_moves.append((row, column))
-        return valid_moves
+        """return valid moves, in the order of rows then columns"""
+        piece = self.next_piece()
+        return [SQUARES[square] for square in sorted(self.frontier)
+                if self.has_flips(square, piece)]
+
+    def mobility(self, is_black_move: bool = None) -> int:
+        """return the number of valid moves of black player if is_black_move,
+        otherwise of white player, or of the current player if it is None"""
+        if is_black_move is None or is_black_move == self.is_black_move:
+            return len(self.valid_moves)
+        piece = BLACK_PIECE if is_black_move else WHITE_PIECE
+        return sum(1 for square in self.frontier if self.has_flips(square, piece))
 
     def make_move(self, move: tuple) -> None:
         """make move and update valid moves"""
         if move not in self.valid_moves:
             raise ValueError
         self.update_board(move[0], move[1])
-        self.update_score()
         self.is_black_move = not self.is_black_move
+        self.hash ^= ZOBRIST_BLACK_MOVE
+        self.valid_moves = self.get_valid_moves()
+
+    def push(self, move: tuple) -> None:
+        """make move in place and remember how to undo it with self.pop"""
+        if move not in self.valid_moves:
+            raise ValueError
+        square = move[0] * 8 + move[1]
+        flipped = self.flip_squares(square, self.next_piece())
+        old = (self.valid_moves, self.black_score, self.white_score, self.hash, self.terms)
+        added = self.place_piece(square, flipped)
+        self.move_stack.append((square, flipped, added) + old)
+        self.is_black_move = not self.is_black_move
+        self.hash ^= ZOBRIST_BLACK_MOVE
         self.valid_moves = self.get_valid_moves()
 
+    def pop(self) -> tuple:
+        """undo the last move made by self.push and return it"""
+        (square, flipped, added, self.valid_moves, self.black_score, self.white_score,
+         self.hash, self.terms) = self.move_stack.pop()
+        self.frontier.difference_update(added)
+        self.frontier.add(square)
+        self.is_black_move = not self.is_black_move
+        opponent_piece = WHITE_PIECE if self.is_black_move else BLACK_PIECE
+        cells = self.cells
+        cells[square] = EMPTY_PIECE
+        for s in flipped:
+            cells[s] = opponent_piece
+        return SQUARES[square]
+
     def is_valid_move(self, row, column) -> bool:
-        """return true iff the move is at empty grid
+        """return true iff the move is at empty grid next to a piece
          and reverse at least one piece"""
-        if self.board[row][column] != EMPTY_PIECE:
-            return False
-        return self.update_board(row, column, for_test=True) > 0
+        square = row * 8 + column
+        return square in self.frontier and self.has_flips(square, self.next_piece())
 
     def update_board(self, row: int, column: int, for_test: bool = False) -> int:
         """get the nearest piece of a new piece
         then update board and return the number of piece change"""
+        square = row * 8 + column
+        flipped = self.flip_squares(square, self.next_piece())
 
         # not change the board when testing the validation
         if not for_test:
-            self.board[row][column] = self.next_piece()
-
-        total_reverse = 0
-        directions = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
-
-        for d in directions:
-            pos = [row + d[0], column + d[1]]  # the position
-            viewed_pos = []
-            should_continue = True
-
-            while all(0 <= x <= 7 for x in pos) and should_continue:
-                if self.board[pos[0]][pos[1]] == EMPTY_PIECE:
-                    should_continue = False
-                elif self.board[pos[0]][pos[1]] != self.next_piece():
-                    viewed_pos.append((pos[0], pos[1]))
-                else:
-                    # not change the board when testing the validation
-                    if len(viewed_pos) != 0 and not for_test:
-                        for v in viewed_pos:
-                            self.board[v[0]][v[1]] = self.next_piece()
-                    total_reverse += len(viewed_pos)
-                    should_continue = False
-                pos[0] += d[0]
-                pos[1] += d[1]
-
-        return total_reverse
-
-    def copy_board(self, is_black_move=None) -> any:
-        """Return the game with same board"""
+            self.place_piece(square, flipped)
+
+        return len(flipped)
+
+    def place_piece(self, square: int, flipped: list[int]) -> list[int]:
+        """place a piece of next player at square, reverse the pieces at the
+        flipped squares and update the hash, the scores, the terms and the
+        frontier. return the squares added to the frontier"""
+        cells = self.cells
+        piece = self.next_piece()
+        opponent_piece = WHITE_PIECE if self.is_black_move else BLACK_PIECE
+        self.hash ^= ZOBRIST[square][cells[square]] ^ ZOBRIST[square][piece]
+        cells[square] = piece
+        for s in flipped:
+            cells[s] = piece
+            self.hash ^= ZOBRIST[s][opponent_piece] ^ ZOBRIST[s][piece]
+
+        if self.is_black_move:
+            self.black_score += len(flipped) + 1
+            self.white_score -= len(flipped)
+        else:
+            self.white_score += len(flipped) + 1
+            self.black_score -= len(flipped)
+
+        if self.terms:
+            # a new piece adds its weight, a reversed piece adds twice its weight
+            sign = 1 if self.is_black_move else -1
+            terms = []
+            for value, weight in zip(self.terms, self.term_weights):
+                change = weight[square]
+                for s in flipped:
+                    change += 2 * weight[s]
+                terms.append(value + sign * change)
+            self.terms = tuple(terms)
+
+        self.frontier.discard(square)
+        added = [s for s in NEIGHBOURS[square]
+                 if s not in self.frontier and cells[s] == EMPTY_PIECE]
+        self.frontier.update(added)
+        return added
+
+    def flip_squares(self, square: int, piece: int) -> list[int]:
+        """return the squares of the pieces reversed by a new piece at square"""
+        cells = self.cells
+        opponent_piece = BLACK_PIECE + WHITE_PIECE - piece
+        flipped = []
+        for ray in FLIP_RAYS[square]:
+            if cells[ray[0]] == opponent_piece:
+                for i, s in enumerate(ray):
+                    if cells[s] != opponent_piece:
+                        if cells[s] == piece:
+                            flipped.extend(ray[:i])
+                        break
+        return flipped
+
+    def has_flips(self, square: int, piece: int) -> bool:
+        """return true iff a new piece at square reverses at least one piece"""
+        cells = self.cells
+        opponent_piece = BLACK_PIECE + WHITE_PIECE - piece
+        for ray in FLIP_RAYS[square]:
+            if cells[ray[0]] == opponent_piece:
+                for s in ray:
+                    if cells[s] != opponent_piece:
+                        if cells[s] == piece:
+                            return True
+                        break
+        return False
+
+    def get_flips(self, row: int, column: int, piece: int = None) -> list[tuple]:
+        """return the pieces reversed by a new piece at (row, column),
+        piece is the piece of next player if it is None"""
+        if piece is None:
+            piece = self.next_piece()
+        return [SQUARES[s] for s in self.flip_squares(row * 8 + column, piece)]
+
+    def copy_board(self, is_black_move=None, term_weights: tuple = None) -> any:
+        """Return the game with same board, and the same terms unless
+        term_weights is given"""
+        if term_weights is None:
+            term_weights = self.term_weights
         if is_black_move is None:
-            return Reversi(copy.deepcopy(self.board), self.is_black_move)
-        return Reversi(copy.deepcopy(self.board), is_black_move)
+            return Reversi(self.board, self.is_black_move, term_weights)
+        return Reversi(self.board, is_black_move, term_weights)
 
     def next_piece(self) -> any:
         """Return the piece of next player"""
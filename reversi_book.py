@@ -0,0 +1,118 @@
+"""CSC111 Final Project: AI Player for Reversi
+
+Instructions:
+This Python module contains the opening book. build_book searches the
+first moves of the game deeply and writes the best move of every position
+to a compact binary file, and OpeningBook reads the file with mmap, so
+the book costs almost no memory or startup time even when many processes
+use it.
+
+The file is a header (magic, version, number of entries) followed by the
+entries sorted by the Zobrist hash of the position, each entry is
+(hash, move square row * 8 + column, score).
+
+Copyright and Usage Information:
+This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
+"""
+import mmap
+import struct
+from reversi_board import Reversi
+from reversi_bitboard import BitboardReversi, SQUARES
+from reversi_player import AlphaBetaSearch, evaluate_score_by_position
+
+MAGIC = b'RVBK'
+VERSION = 1
+HEADER = struct.Struct('<4sHI')
+ENTRY = struct.Struct('<QBh')
+
+
+def build_book(path: str,
+               plies: int = 8,
+               depth: int = 6,
+               branching: int = 2,
+               evaluate: callable = evaluate_score_by_position) -> int:
+    """search the positions of the first plies moves and write the book to path,
+    return the number of positions in the book.
+
+    Every position is searched to depth by alpha-beta search. From each
+    position, the book follows the best move and the next branching - 1 moves
+    in the order of the search, so it has about branching ** plies positions.
+    """
+    entries = {}
+    _add_positions(BitboardReversi(), plies, depth, branching, evaluate, entries)
+    with open(path, 'wb') as book_file:
+        book_file.write(HEADER.pack(MAGIC, VERSION, len(entries)))
+        for key in sorted(entries):
+            square, score = entries[key]
+            book_file.write(ENTRY.pack(key, square, max(-32768, min(32767, int(score)))))
+    return len(entries)
+
+
+def _add_positions(game: BitboardReversi, plies: int, depth: int, branching: int,
+                   evaluate: callable, entries: dict) -> None:
+    """add the best move of game and of the positions after it to entries"""
+    if plies == 0 or game.valid_moves == [] or game.hash in entries:
+        return
+    searcher = AlphaBetaSearch(game.is_black_move, evaluate)
+    move, score, _ = searcher.search_root(game, depth)
+    entries[game.hash] = (move[0] * 8 + move[1], score)
+    moves = searcher.order_moves(game, depth, move)[:branching]
+    for m in moves:
+        game.push(m)
+        _add_positions(game, plies - 1, depth, branching, evaluate, entries)
+        game.pop()
+
+
+class OpeningBook:
+    """The opening book file read by mmap
+
+    Instance Attributes:
+        - path: the path of the book file
+        - size: the number of positions in the book
+    """
+    path: str
+    size: int
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as book_file:
+            self._mmap = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not an opening book')
+
+    def lookup(self, game: Reversi) -> any:
+        """return (move, score) of game in the book, or None if game is not
+        in the book or the move is not valid"""
+        key = game.hash
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            middle_key = ENTRY.unpack_from(self._mmap, HEADER.size + middle * ENTRY.size)[0]
+            if middle_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.size:
+            return None
+        entry_key, square, score = ENTRY.unpack_from(self._mmap, HEADER.size + low * ENTRY.size)
+        if entry_key != key or SQUARES[square] not in game.valid_moves:
+            return None
+        return SQUARES[square], score
+
+    def close(self) -> None:
+        """close the book file"""
+        self._mmap.close()
+
+    def __getstate__(self) -> dict:
+        """pickle the book by its path, so it can be sent to other processes"""
+        return {'path': self.path}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state['path'])
+
+
+if __name__ == '__main__':
+    print('positions in the book:', build_book('opening.book', plies=4, depth=4))
+    book = OpeningBook('opening.book')
+    print('the book move of the first move is', book.lookup(Reversi()))
@@ -0,0 +1,230 @@
+"""CSC111 Final Project: AI Player for Reversi
+
+Instructions:
+This Python module is the command line interface of the engine, which
+needs neither a display nor pygame, tkinter or plotly. It has three
+commands:
+    - match: play games between two computer players, which swap colours
+        after each game, and print the results
+    - analyse: print the position after some moves and the score of each
+        valid move, searched by alpha-beta
+    - benchmark: run reversi_benchmark with the rest of the arguments
+For example
+    python reversi_cli.py match position piece --games 20 --depth 3 --workers 4
+    python reversi_cli.py analyse --moves "e3 f5 e6" --depth 5
+    python reversi_cli.py benchmark --baseline baseline.json
+
+Moves are written as a column letter and a row number, so (row, column)
+(2, 4) is e3. Only the modules needed by a command are imported, so a
+command and its worker processes start quickly.
+
+Copyright and Usage Information:
+This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
+"""
+import argparse
+import sys
+import time
+from reversi_board import Reversi, BLACK_PIECE, WHITE_PIECE
+from reversi_bitboard import new_game
+from reversi_player import Player, RandomPlayer, MiniMaxPlayer, AlphaBetaSearch, \
+    INFINITY, evaluate_score_by_piece, evaluate_score_by_position
+
+PLAYERS = ['random', 'piece', 'position', 'pattern', 'mcts']
+PIECE_TEXT = {BLACK_PIECE: 'X', WHITE_PIECE: 'O'}
+
+
+def parse_move(text: str) -> tuple[int, int]:
+    """return (row, column) of a move written as a column letter and a row number"""
+    column, row = 'abcdefgh'.find(text[:1].lower()), text[1:]
+    if column < 0 or not row.isdigit() or not 1 <= int(row) <= 8:
+        raise ValueError(f'{text} is not a move')
+    return int(row) - 1, column
+
+
+def move_name(move: tuple[int, int]) -> str:
+    """return move (row, column) as a column letter and a row number"""
+    return 'abcdefgh'[move[1]] + str(move[0] + 1)
+
+
+def positive_int(text: str) -> int:
+    """return the integer of text, the type of the arguments which must be at least 1"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f'{text} is not at least 1')
+    return value
+
+
+def board_text(game: Reversi) -> str:
+    """return the board of game as text, X for black and O for white"""
+    lines = ['  ' + ' '.join('abcdefgh')]
+    for row, pieces in enumerate(game.board):
+        lines.append(f'{row + 1} ' + ' '.join(PIECE_TEXT.get(piece, '.') for piece in pieces))
+    return '\n'.join(lines)
+
+
+def get_evaluator(name: str) -> callable:
+    """return the evaluation function of name"""
+    if name == 'pattern':
+        # the pattern tables take a moment to build, so they are only
+        # imported when the pattern evaluation is used
+        from reversi_pattern import evaluate_score_by_pattern
+        return evaluate_score_by_pattern
+    return {'piece': evaluate_score_by_piece, 'position': evaluate_score_by_position}[name]
+
+
+def make_player(name: str, game: Reversi, depth: int, think_time: float,
+                search: str, bitboard: bool) -> Player:
+    """return the player name of PLAYERS for game"""
+    if name == 'random':
+        return RandomPlayer(game)
+    if name == 'mcts':
+        from reversi_mcts import MCTSPlayer
+        return MCTSPlayer(game, 500 * depth)
+    return MiniMaxPlayer(game, depth, think_time, get_evaluator(name),
+                         bitboard=bitboard, search=search, endgame=min(12, 2 * depth))
+
+
+def play_match_game(task: tuple) -> tuple[int, str, any]:
+    """play game index between the players of task, the first player is black
+    in the even games, return the index, 'first', 'second' or 'tie', and the
+    record of the game"""
+    import random
+    from reversi_record import GameRecord
+    names, depth, think_time, search, bitboard, seed, index = task
+    random.seed(f'{seed}:{index}')
+    game, moves = new_game(bitboard), []
+    black, white = names if index % 2 == 0 else names[::-1]
+    players = {True: make_player(black, game, depth, think_time, search, bitboard),
+               False: make_player(white, game, depth, think_time, search, bitboard)}
+    try:
+        while game.winner() is None:
+            move = players[game.is_black_move].think_move()
+            game.make_move(move)
+            moves.append(move)
+    finally:
+        for player in players.values():
+            player.close()
+    first, second = ('first', 'second') if index % 2 == 0 else ('second', 'first')
+    outcome = {'BLACK PLAYER': first, 'WHITE PLAYER': second, 'TIE': 'tie'}[game.winner()]
+    return index, outcome, GameRecord.from_game(game, moves, black, white, seed, index)
+
+
+def run_match(args: argparse.Namespace) -> None:
+    """play the games of the match command and print the results"""
+    names = (args.first, args.second)
+    if args.first == args.second:
+        names = (args.first + ' 1', args.second + ' 2')
+    tasks = [((args.first, args.second), args.depth, args.think_time, args.search,
+              args.bitboard, args.seed, i) for i in range(args.games)]
+    writer = None
+    if args.record is not None:
+        from reversi_record import GameRecordWriter
+        writer = GameRecordWriter(args.record)
+    pool = None
+    if args.workers == 1:
+        results = map(play_match_game, tasks)
+    else:
+        import multiprocessing
+        pool = multiprocessing.Pool(args.workers)
+        results = pool.imap_unordered(play_match_game, tasks)
+    wins = {'first': 0, 'second': 0, 'tie': 0}
+    start_time = time.time()
+    try:
+        for index, outcome, game_record in results:
+            wins[outcome] += 1
+            if writer is not None:
+                writer.write(game_record)
+            if args.verbose:
+                print(f'game {index}: {game_record.black_player} (black) vs '
+                      f'{game_record.white_player} (white), '
+                      f'{game_record.black_score}-{game_record.white_score}')
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if writer is not None:
+            writer.close()
+    score = (wins['first'] + wins['tie'] / 2) / args.games
+    print(f'{args.games} games in {time.time() - start_time:.1f} seconds')
+    print(f'{names[0]} {wins["first"]}, {names[1]} {wins["second"]}, ties {wins["tie"]}, '
+          f'score of {names[0]} {score:.3f}')
+
+
+def run_analyse(args: argparse.Namespace) -> None:
+    """print the position of the analyse command and the score of each move"""
+    game = new_game(args.bitboard)
+    for move in args.moves.split():
+        if parse_move(move) not in game.valid_moves:
+            raise ValueError(f'{move} is not a valid move')
+        game.make_move(parse_move(move))
+    print(board_text(game))
+    print(f'black {game.black_score}, white {game.white_score}, '
+          f'{"black" if game.is_black_move else "white"} to move')
+    if game.winner() is not None:
+        print('the game is over, the winner is', game.winner())
+        return
+    evaluate = get_evaluator(args.evaluate)
+    searcher = AlphaBetaSearch(game.is_black_move, evaluate)
+    start_time = time.time()
+    scores, lines = {}, {}
+    for move in game.valid_moves:
+        game.push(move)
+        lines[move] = []
+        scores[move] = -searcher.search(game, args.depth - 1, -INFINITY, INFINITY,
+                                        line=lines[move])
+        game.pop()
+    # sorted keeps the order of game.valid_moves among equal scores
+    for move in sorted(scores, key=lambda m: -scores[m]):
+        print(f'{move_name(move)} {scores[move]:g}  '
+              + ' '.join(move_name(m) for m in lines[move]))
+    print(f'{searcher.nodes} positions in {time.time() - start_time:.2f} seconds')
+
+
+def main(argv: list[str] = None) -> int:
+    """run a command from the command line"""
+    parser = argparse.ArgumentParser(description='Reversi engine without a display')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    match = commands.add_parser('match', help='play games between two players')
+    match.add_argument('first', choices=PLAYERS)
+    match.add_argument('second', choices=PLAYERS)
+    match.add_argument('--games', type=positive_int, default=10)
+    match.add_argument('--depth', type=positive_int, default=3)
+    match.add_argument('--think-time', type=float, default=99)
+    match.add_argument('--search', default='alphabeta',
+                       choices=['minimax', 'alphabeta', 'iterative'])
+    match.add_argument('--list-board', dest='bitboard', action='store_false',
+                       help='use the nested list board instead of the bitboard')
+    match.add_argument('--workers', type=int, default=1,
+                       help='the number of processes, 0 for the number of cores')
+    match.add_argument('--seed', type=int, default=0)
+    match.add_argument('--record', help='append the games to this record file')
+    match.add_argument('--verbose', action='store_true', help='print every game')
+
+    analyse = commands.add_parser('analyse', help='score the moves of a position')
+    analyse.add_argument('--moves', default='', help='the moves from the start, like "e3 f5"')
+    analyse.add_argument('--depth', type=positive_int, default=4)
+    analyse.add_argument('--evaluate', default='position', choices=PLAYERS[1:4])
+    analyse.add_argument('--list-board', dest='bitboard', action='store_false')
+
+    commands.add_parser('benchmark', add_help=False,
+                        help='run reversi_benchmark with the other arguments')
+
+    args, rest = parser.parse_known_args(argv)
+    if args.command == 'benchmark':
+        from reversi_benchmark import main as benchmark_main
+        return benchmark_main(rest)
+    if rest:
+        parser.error(f'unrecognized arguments: {" ".join(rest)}')
+    if args.command == 'match':
+        args.workers = args.workers or None
+        run_match(args)
+    else:
+        try:
+            run_analyse(args)
+        except ValueError as error:
+            parser.error(str(error))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
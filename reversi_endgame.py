@@ -0,0 +1,146 @@
+"""CSC111 Final Project: AI Player for Reversi
+
+Instructions:
+This Python module contains the exact endgame solver. When only a few
+empty squares are left, it searches every line to the end of the game and
+finds the move with the best final disc difference, or only whether the
+move wins, loses or draws.
+
+As in reversi_board.Reversi, the game ends when the current player has no
+valid move, and the final score is the difference of the pieces on board.
+
+Copyright and Usage Information:
+This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
+"""
+from reversi_board import Reversi
+from reversi_bitboard import BitboardReversi, SQUARES, find_moves, find_flips, bits_to_squares
+
+# the bitboards of the four 4x4 corners of the board, for parity ordering
+QUADRANTS = [0x0F0F0F0F, 0xF0F0F0F0, 0x0F0F0F0F << 32, 0xF0F0F0F0 << 32]
+QUADRANT_OF = [next(i for i, q in enumerate(QUADRANTS) if q >> s & 1) for s in range(64)]
+
+# the positions with at least this many empty squares are kept in the table
+TABLE_EMPTIES = 6
+FASTEST_FIRST_EMPTIES = 7
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+
+class EndgameSolver:
+    """The exact alpha-beta search to the end of the game on bitboards
+
+    Moves are ordered by parity, the moves in a region with an odd number
+    of empty squares first, and near the root by fastest first, the moves
+    after which the opponent has the fewest valid moves first.
+
+    Instance Attributes:
+        - nodes: the number of positions searched
+        - table: the results of the searched positions by (own, opponent)
+    """
+    nodes: int
+    table: dict
+
+    def __init__(self) -> None:
+        self.nodes = 0
+        self.table = {}
+
+    def solve(self, game: Reversi, exact: bool = True) -> tuple[any, int]:
+        """return the best move of game and the final disc difference for the
+        current player. If not exact, only the sign of the score is correct:
+        positive for a win, 0 for a draw and negative for a loss."""
+        own, opponent = BitboardReversi.from_game(game).own_and_opponent()
+        alpha, beta = (-64, 64) if exact else (-1, 1)
+        best_move = None
+        for square in self.order_moves(own, opponent, find_moves(own, opponent)):
+            flips = find_flips(square, own, opponent)
+            new_own, new_opponent = opponent ^ flips, own | flips | (1 << square)
+            if best_move is None:
+                score = -self.search(new_own, new_opponent, -beta, -alpha)
+            else:
+                # a null window search is enough to show the move is not better
+                score = -self.search(new_own, new_opponent, -alpha - 1, -alpha)
+                if alpha < score < beta:
+                    score = -self.search(new_own, new_opponent, -beta, -score)
+            if best_move is None or score > alpha:
+                best_move, alpha = SQUARES[square], max(alpha, score)
+            if alpha >= beta:
+                break
+        return best_move, alpha
+
+    def search(self, own: int, opponent: int, alpha: int, beta: int) -> int:
+        """return the final disc difference for the player of own,
+        if it is between alpha and beta, otherwise a bound of it"""
+        self.nodes += 1
+        moves = find_moves(own, opponent)
+        if not moves:
+            return own.bit_count() - opponent.bit_count()
+
+        empties = 64 - (own | opponent).bit_count()
+        key = None
+        if empties >= TABLE_EMPTIES:
+            key = (own, opponent)
+            entry = self.table.get(key)
+            if entry is not None:
+                flag, value = entry
+                if flag == EXACT:
+                    return value
+                if flag == LOWER_BOUND and value >= beta:
+                    return value
+                if flag == UPPER_BOUND and value <= alpha:
+                    return value
+
+        original_alpha = alpha
+        squares = self.order_moves(own, opponent, moves) if empties > 3 else bits_to_squares(moves)
+        for square in squares:
+            flips = find_flips(square, own, opponent)
+            score = -self.search(opponent ^ flips, own | flips | (1 << square), -beta, -alpha)
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+
+        if key is not None:
+            if alpha >= beta:
+                self.table[key] = (LOWER_BOUND, alpha)
+            elif alpha > original_alpha:
+                self.table[key] = (EXACT, alpha)
+            else:
+                self.table[key] = (UPPER_BOUND, alpha)
+        return alpha
+
+    def order_moves(self, own: int, opponent: int, moves: int) -> list[int]:
+        """return the squares of moves, by fastest first if there are enough
+        empty squares, then by parity"""
+        empty = ~(own | opponent)
+        odd = [(empty & q).bit_count() & 1 for q in QUADRANTS]
+        squares = bits_to_squares(moves)
+        if 64 - (own | opponent).bit_count() < FASTEST_FIRST_EMPTIES:
+            return sorted(squares, key=lambda s: -odd[QUADRANT_OF[s]])
+        keys = {}
+        for square in squares:
+            flips = find_flips(square, own, opponent)
+            mobility = find_moves(opponent ^ flips, own | flips | (1 << square)).bit_count()
+            keys[square] = (mobility, -odd[QUADRANT_OF[square]])
+        return sorted(squares, key=keys.__getitem__)
+
+
+def count_empties(game: Reversi) -> int:
+    """return the number of empty squares of game"""
+    return 64 - game.black_score - game.white_score
+
+
+def solve_endgame(game: Reversi, exact: bool = True) -> tuple[any, int]:
+    """return the best move of game and its final disc difference for the
+    current player, see EndgameSolver.solve"""
+    return EndgameSolver().solve(game, exact)
+
+
+if __name__ == '__main__':
+    import random
+    import time
+    random.seed(1)
+    r = Reversi()
+    while count_empties(r) > 14 and r.winner() is None:
+        r.make_move(random.choice(r.valid_moves))
+    start_time = time.time()
+    solver = EndgameSolver()
+    print(solver.solve(r), f'{solver.nodes} nodes in {time.time() - start_time:.2f} seconds')
@@ -0,0 +1,210 @@
+"""CSC111 Final Project: AI Player for Reversi
+
+Instructions:
+This Python module runs the AI players in a worker thread, so the
+user interface keeps responding while a player thinks. While the human
+thinks, the engine ponders: it thinks its reply to each move the human
+may make, and the reply is ready at once if the human makes one of them.
+
+BackgroundAnalysis scores every valid move of a position in a worker
+thread with alpha-beta searches of depth 1, 2, ... and keeps the scores of
+each completed depth by the hash of the position, for the analysis mode.
+
+Copyright and Usage Information:
+This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
+"""
+import copy
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from reversi_board import Reversi
+from reversi_bitboard import BitboardReversi
+from reversi_player import Player, AlphaBetaSearch, SearchTimeout, INFINITY, \
+    evaluate_score_by_piece, evaluate_score_by_position
+from reversi_transposition import TranspositionTable
+
+
+class BackgroundEngine:
+    """Runs think_move of a player in a worker thread
+
+    The player thinks on a copy of the game, so the game of the user interface
+    is never changed by the worker. The futures of the positions the engine has
+    started to think are cached by the hash of the position.
+
+    Instance Attributes:
+        - player: the player who thinks the moves
+        - cache: the futures of (move, thinking player) by the hash of the game
+        - pondered: the hash of the last game whose replies are pondered, or None
+    """
+    player: Player
+    cache: dict[int, Future]
+    pondered: any
+
+    def __init__(self, player: Player) -> None:
+        self.player = player
+        self.cache = {}
+        self.pondered = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._lock = threading.Lock()
+        # the running copy of the player and the hash of the game it thinks
+        self._thinker = None
+        self._thinking = None
+
+    def think(self, game: Reversi) -> Future:
+        """return the future of the move of the player in game, which is the
+        pondered one if the engine has started to think about game"""
+        self.stop_pondering(keep=game.hash)
+        with self._lock:
+            future = self.cache.get(game.hash)
+            if future is None or future.cancelled():
+                future = self._executor.submit(self._think, game.copy_board())
+                self.cache[game.hash] = future
+        return future
+
+    def result(self, future: Future) -> tuple:
+        """return the move of a finished future of self.think and forget the
+        positions thought before it"""
+        move, thinker = future.result()
+        # the private attributes belong to the search of the thinker
+        for name, value in vars(thinker).items():
+            if name != 'game' and not name.startswith('_'):
+                setattr(self.player, name, value)
+        with self._lock:
+            self.cache.clear()
+        self.pondered = None
+        return move
+
+    def ponder(self, game: Reversi) -> None:
+        """start to think the replies to the moves of the other player in game,
+        the moves with a better position for the other player first"""
+        if self.pondered == game.hash:
+            return
+        self.pondered = game.hash
+        replies = []
+        for move in game.valid_moves:
+            reply = game.copy_board()
+            reply.make_move(move)
+            if reply.winner() is None:
+                # the score is for the engine, so the lowest score is the best
+                # move of the other player
+                replies.append((evaluate_score_by_position(reply, reply.is_black_move), reply))
+        replies.sort(key=lambda r: r[0])
+        with self._lock:
+            for _, reply in replies:
+                if reply.hash not in self.cache:
+                    self.cache[reply.hash] = self._executor.submit(self._think, reply)
+
+    def stop_pondering(self, keep: any = None) -> None:
+        """cancel the pondered positions except keep, and stop the one which
+        is being thought unless it is keep"""
+        with self._lock:
+            for key, future in list(self.cache.items()):
+                if key != keep and (future.cancel() or not future.done()):
+                    del self.cache[key]
+            if self._thinker is not None and self._thinking != keep:
+                self._thinker.stop()
+        self.pondered = None
+
+    def shutdown(self) -> None:
+        """cancel the waiting thoughts, stop the running one and the worker thread"""
+        self.stop_pondering()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _think(self, game: Reversi) -> tuple[tuple, Player]:
+        """return the move of a copy of the player in game and the copy,
+        or None for the move if the game was dropped before it started"""
+        thinker = copy.copy(self.player)
+        thinker.game = game
+        with self._lock:
+            if game.hash not in self.cache:
+                return None, thinker
+            self._thinker, self._thinking = thinker, game.hash
+        try:
+            return thinker.think_move(), thinker
+        finally:
+            with self._lock:
+                self._thinker, self._thinking = None, None
+
+
+class BackgroundAnalysis:
+    """Scores the valid moves of a position in a worker thread, one depth
+    after another
+
+    The score of a move is the minimax score of the position after it for
+    the current player, the same as apply_minimax on a game tree of depth
+    levels. When the analysed position changes, the running search is
+    stopped, and the scores found so far stay in the cache, so a position
+    analysed before is shown at once and deepened from where it stopped.
+
+    Instance Attributes:
+        - evaluate: the evaluation function of the searches
+        - max_depth: the deepest search of a position
+        - cache: (depth, scores) of the deepest completed search by the hash
+            of the position, where scores maps each valid move to its score
+    """
+    evaluate: callable
+    max_depth: int
+    cache: dict[int, tuple[int, dict]]
+
+    def __init__(self, evaluate: callable = evaluate_score_by_piece, max_depth: int = 8) -> None:
+        self.evaluate = evaluate
+        self.max_depth = max_depth
+        self.cache = {}
+        # the searches of each player share a transposition table, since
+        # the scores depend on the player they are for
+        self._tables = {True: TranspositionTable(), False: TranspositionTable()}
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._lock = threading.Lock()
+        self._position = None
+        self._searcher = None
+
+    def analyse(self, game: Reversi) -> None:
+        """start to analyse game unless it is analysed already, and stop the
+        analysis of any other position"""
+        with self._lock:
+            if self._position == game.hash:
+                return
+            self._position = game.hash
+            if self._searcher is not None:
+                # the searcher raises SearchTimeout at its next position
+                self._searcher.deadline = 0
+        depth, _ = self.cache.get(game.hash, (0, None))
+        if depth < self.max_depth and game.valid_moves != []:
+            self._executor.submit(self._analyse, BitboardReversi.from_game(game))
+
+    def scores(self, game: Reversi) -> tuple[int, dict]:
+        """return (depth, scores) of the deepest completed analysis of game,
+        or (0, {}) if no depth is completed"""
+        return self.cache.get(game.hash, (0, {}))
+
+    def shutdown(self) -> None:
+        """stop the analysis and the worker thread"""
+        with self._lock:
+            self._position = None
+            if self._searcher is not None:
+                self._searcher.deadline = 0
+        self._executor.shutdown(wait=False)
+
+    def _analyse(self, game: BitboardReversi) -> None:
+        """search game with depth 1, 2, ... self.max_depth after the deepest
+        completed depth, until it is no longer the analysed position"""
+        searcher = AlphaBetaSearch(game.is_black_move, self.evaluate,
+                                   table=self._tables[game.is_black_move])
+        with self._lock:
+            if self._position != game.hash:
+                return
+            self._searcher = searcher
+        try:
+            depth, _ = self.cache.get(game.hash, (0, None))
+            for depth in range(depth + 1, self.max_depth + 1):
+                scores = {}
+                for move in game.valid_moves:
+                    game.push(move)
+                    scores[move] = -searcher.search(game, depth - 1, -INFINITY, INFINITY)
+                    game.pop()
+                self.cache[game.hash] = (depth, scores)
+        except SearchTimeout:
+            pass
+        finally:
+            with self._lock:
+                if self._searcher is searcher:
+                    self._searcher = None
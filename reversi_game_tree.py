@@ -6,6 +6,8 @@ This Python module contains the game tree of Reversi
 Copyright and Usage Information:
 This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
 """
+import sys
+
 START = '*'
 
 
@@ -19,7 +21,11 @@ class GameTree:
             black player or white player after the move is made
         - is_black_move: true iff the next player is black player
         - sub_trees: a list of possible moves after the self.move is made
+
+    The nodes use __slots__ instead of a __dict__, since a deep tree has
+    millions of them.
     """
+    __slots__ = ('move', 'score', 'is_black_move', 'sub_trees')
     move: tuple[int]
     score: int
     is_black_move: bool
@@ -41,18 +47,24 @@ class GameTree:
         The indentation level is specified by the <depth> parameter.
         modified from a2
         """
-        if self.is_black_move:
-            turn_desc = "Black"
-        else:
-            turn_desc = "White"
-        move_desc = f'{self.move} [{self.score}] -> {turn_desc}\n'
-        s = '  ' * depth + move_desc
-        if self.sub_trees == []:
-            return s
-        else:
-            for subtree in self.sub_trees:
-                s += subtree.str_indented(depth + 1)
-            return s
+        return ''.join(self.lines_indented(depth))
+
+    def lines_indented(self, depth: int) -> any:
+        """Yield the lines of the indented string representation of this tree,
+        without building the whole string"""
+        stack = [(self, depth)]
+        while stack:
+            tree, d = stack.pop()
+            turn_desc = "Black" if tree.is_black_move else "White"
+            yield '  ' * d + f'{tree.move} [{tree.score}] -> {turn_desc}\n'
+            stack.extend((subtree, d + 1) for subtree in reversed(tree.sub_trees))
+
+    def write_indented(self, stream: any = None, depth: int = 0) -> None:
+        """Write the indented string representation of this tree to stream,
+        sys.stdout by default, line by line"""
+        stream = sys.stdout if stream is None else stream
+        for line in self.lines_indented(depth):
+            stream.write(line)
 
     def add_subtree(self, subtree: any) -> None:
         """add a new move after self.move"""
@@ -0,0 +1,243 @@
+"""CSC111 Final Project: AI Player for Reversi
+
+Instructions:
+This Python module contains the Monte Carlo Tree Search (MCTS) player.
+The player selects moves in the tree by the UCT formula, plays a random
+game from the selected position, and counts the wins of each move.
+
+The statistics of the nodes are kept in flat arrays instead of one Python
+object per node, so the tree of hundreds of thousands of playouts uses
+little memory.
+
+Copyright and Usage Information:
+This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
+"""
+import math
+import random
+import time
+from array import array
+from reversi_board import Reversi
+from reversi_bitboard import BitboardReversi, SQUARES, find_moves, find_flips, bits_to_squares
+from reversi_player import Player
+
+UNEXPANDED = -1
+
+
+class MCTSTree:
+    """The search tree of MCTSPlayer stored as flat arrays
+
+    Node 0 is the root. The children of a node are stored next to each
+    other, from first_child[node] to first_child[node] + child_count[node] - 1.
+
+    Instance Attributes:
+        - parent: the parent of each node, -1 for the root
+        - first_child: the index of the first child of each node
+        - child_count: the number of children of each node, UNEXPANDED if
+            the children are not added yet
+        - move: the square row * 8 + column of the move to each node
+        - black_moved: 1 iff black player made the move to each node
+        - visits: the number of playouts through each node
+        - wins: the wins of the player who made the move to each node,
+            a tie counts as half a win
+    """
+    parent: array
+    first_child: array
+    child_count: array
+    move: array
+    black_moved: array
+    visits: array
+    wins: array
+
+    def __init__(self, black_moved: bool = False) -> None:
+        """Initialize the tree with the root only"""
+        self.parent = array('i', [-1])
+        self.first_child = array('i', [0])
+        self.child_count = array('i', [UNEXPANDED])
+        self.move = array('b', [-1])
+        self.black_moved = array('b', [black_moved])
+        self.visits = array('i', [0])
+        self.wins = array('d', [0.0])
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def expand(self, node: int, game: BitboardReversi) -> None:
+        """add the valid moves of game as the children of node"""
+        self.first_child[node] = len(self.parent)
+        self.child_count[node] = len(game.valid_moves)
+        black_moved = game.is_black_move
+        for row, column in game.valid_moves:
+            self.parent.append(node)
+            self.first_child.append(0)
+            self.child_count.append(UNEXPANDED)
+            self.move.append(row * 8 + column)
+            self.black_moved.append(black_moved)
+            self.visits.append(0)
+            self.wins.append(0.0)
+
+    def children(self, node: int) -> range:
+        """return the indices of the children of node"""
+        first = self.first_child[node]
+        return range(first, first + max(self.child_count[node], 0))
+
+    def select(self, node: int, exploration: float) -> int:
+        """return the child of node with the largest UCT value,
+        an unvisited child is selected first"""
+        log_visits = math.log(max(self.visits[node], 1))
+        best_child, best_value = -1, -1.0
+        for child in self.children(node):
+            visits = self.visits[child]
+            if visits == 0:
+                return child
+            value = self.wins[child] / visits + exploration * math.sqrt(log_visits / visits)
+            if value > best_value:
+                best_child, best_value = child, value
+        return best_child
+
+    def backpropagate(self, node: int, black_result: float) -> None:
+        """add a playout with black_result (1 for black wins, 0.5 for tie, 0 for
+        white wins) to node and its ancestors"""
+        while node != -1:
+            self.visits[node] += 1
+            self.wins[node] += black_result if self.black_moved[node] else 1 - black_result
+            node = self.parent[node]
+
+    def subtree(self, node: int) -> any:
+        """return a new tree with the copy of the subtree of node"""
+        tree = MCTSTree(bool(self.black_moved[node]))
+        tree.visits[0], tree.wins[0] = self.visits[node], self.wins[node]
+        queue = [(node, 0)]
+        while queue:
+            old, new = queue.pop()
+            if self.child_count[old] == UNEXPANDED:
+                continue
+            tree.first_child[new] = len(tree.parent)
+            tree.child_count[new] = self.child_count[old]
+            for child in self.children(old):
+                queue.append((child, len(tree.parent)))
+                tree.parent.append(new)
+                tree.first_child.append(0)
+                tree.child_count.append(UNEXPANDED)
+                tree.move.append(self.move[child])
+                tree.black_moved.append(self.black_moved[child])
+                tree.visits.append(self.visits[child])
+                tree.wins.append(self.wins[child])
+        return tree
+
+
+def random_playout(black: int, white: int, is_black_move: bool) -> float:
+    """play random moves until the game ends,
+    return 1 if black wins, 0.5 for tie and 0 if white wins"""
+    own, opponent = (black, white) if is_black_move else (white, black)
+    moves = find_moves(own, opponent)
+    while moves:
+        square = random.choice(bits_to_squares(moves))
+        flips = find_flips(square, own, opponent)
+        own, opponent = opponent ^ flips, own | flips | (1 << square)
+        is_black_move = not is_black_move
+        moves = find_moves(own, opponent)
+    black, white = (own, opponent) if is_black_move else (opponent, own)
+    black_score, white_score = black.bit_count(), white.bit_count()
+    if black_score == white_score:
+        return 0.5
+    return 1.0 if black_score > white_score else 0.0
+
+
+class MCTSPlayer(Player):
+    """The player follow Monte Carlo Tree Search with UCT
+
+    Instance Attributes:
+        - game: the reversi game
+        - playouts: the number of playouts for each move
+        - think_time: maximum time for each move in seconds, or None to
+            stop after self.playouts playouts only
+        - exploration: the exploration constant of the UCT formula
+        - reuse_tree: true iff the tree of the position reached after the
+            last move and the reply of the opponent is kept
+        - tree: the search tree of the last move, or None
+        - tree_game: the game at the root of self.tree, or None
+    """
+    game: Reversi
+    playouts: int
+    think_time: any
+    exploration: float
+    reuse_tree: bool
+    tree: any
+    tree_game: any
+
+    def __init__(self, game: Reversi, playouts: int = 1000, think_time: float = None,
+                 exploration: float = 1.4, reuse_tree: bool = True) -> None:
+        """Initialize the player"""
+        super().__init__(game)
+        self.playouts = playouts
+        self.think_time = think_time
+        self.exploration = exploration
+        self.reuse_tree = reuse_tree
+        self.tree = None
+        self.tree_game = None
+
+    def think_move(self) -> tuple[int]:
+        """Make move by Monte Carlo Tree Search"""
+        game = BitboardReversi.from_game(self.game)
+        tree = self.reused_tree(game) if self.reuse_tree else None
+        if tree is None:
+            tree = MCTSTree(not game.is_black_move)
+        deadline = None if self.think_time is None else time.time() + self.think_time
+        for i in range(self.playouts):
+            if deadline is not None and i % 16 == 0 and time.time() > deadline:
+                break
+            self.playout(tree, game)
+
+        if tree.child_count[0] <= 0:
+            return random.choice(self.game.valid_moves)
+        best = max(tree.children(0), key=tree.visits.__getitem__)
+        self.tree, self.tree_game = tree, game
+        return SQUARES[tree.move[best]]
+
+    def playout(self, tree: MCTSTree, game: BitboardReversi) -> None:
+        """select a leaf of tree, expand it, play a random game from it and
+        record the result. game is the position at the root of tree"""
+        node, depth = 0, 0
+        while tree.child_count[node] > 0:
+            node = tree.select(node, self.exploration)
+            game.push(SQUARES[tree.move[node]])
+            depth += 1
+        if tree.child_count[node] == UNEXPANDED and game.valid_moves != []:
+            tree.expand(node, game)
+            node = tree.select(node, self.exploration)
+            game.push(SQUARES[tree.move[node]])
+            depth += 1
+        elif tree.child_count[node] == UNEXPANDED:
+            tree.child_count[node] = 0
+        tree.backpropagate(node, random_playout(game.black, game.white, game.is_black_move))
+        for _ in range(depth):
+            game.pop()
+
+    def reused_tree(self, game: BitboardReversi) -> any:
+        """return the subtree of self.tree at game, which is reached by the last
+        move of the player and the reply of the opponent, or None"""
+        if self.tree is None:
+            return None
+        tree, tree_game = self.tree, self.tree_game
+        for child in tree.children(0):
+            tree_game.push(SQUARES[tree.move[child]])
+            for grandchild in tree.children(child):
+                tree_game.push(SQUARES[tree.move[grandchild]])
+                found = tree_game.hash == game.hash and tree_game.black == game.black \
+                    and tree_game.white == game.white
+                tree_game.pop()
+                if found:
+                    tree_game.pop()
+                    return tree.subtree(grandchild)
+            tree_game.pop()
+        return None
+
+
+if __name__ == '__main__':
+    from reversi_player import RandomPlayer
+    r = Reversi()
+    mcts = MCTSPlayer(r, 500)
+    random_player = RandomPlayer(r)
+    while r.winner() is None:
+        r.make_move(mcts.think_move() if r.is_black_move else random_player.think_move())
+    print(f'MCTS player is black, the winner is {r.winner()}')
@@ -0,0 +1,269 @@
+"""CSC111 Final Project: AI Player for Reversi
+
+Instructions:
+This Python module contains the parallel alpha-beta search. The moves
+of the current player are split among the processes of a process pool
+(root splitting) and all processes share one transposition table in
+shared memory, so a position searched by one process is not searched
+again by the others.
+
+Copyright and Usage Information:
+This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
+"""
+import multiprocessing
+import time
+import weakref
+from multiprocessing import shared_memory
+from reversi_board import Reversi
+from reversi_player import AlphaBetaSearch, INFINITY
+from reversi_transposition import REPLACEMENT_POLICIES
+
+NO_MOVE = 64
+SCORE_OFFSET = 1 << 31
+
+
+def pack_entry(depth: int, score: int, flag: int, move: any, age: int) -> int:
+    """return the entry packed in 64 bits:
+    score (32 bits), age (8 bits), depth (8 bits), move (7 bits), flag (2 bits).
+    raise ValueError if score is not an integer, since a rounded bound
+    could cut off a move which is better"""
+    if score != int(score):
+        raise ValueError(f'the scores of a shared table must be integers, not {score}')
+    square = NO_MOVE if move is None else move[0] * 8 + move[1]
+    return ((int(score) + SCORE_OFFSET) << 32) | ((age & 0xFF) << 24) \
+        | ((depth & 0xFF) << 16) | (square << 8) | flag
+
+
+def unpack_entry(data: int) -> tuple[int, int, int, any, int]:
+    """return (depth, score, flag, move, age) of a packed entry"""
+    square = (data >> 8) & 0x7F
+    move = None if square == NO_MOVE else (square // 8, square % 8)
+    return ((data >> 16) & 0xFF, (data >> 32) - SCORE_OFFSET, data & 0x3, move,
+            (data >> 24) & 0xFF)
+
+
+class SharedTranspositionTable:
+    """A transposition table in shared memory, with the same interface as
+    reversi_transposition.TranspositionTable
+
+    Each slot is two 64-bit words, key ^ data and data, where data is the
+    packed entry. The processes write without locks, and a slot whose two
+    words are from different writes does not match its key, so it is read as
+    missing. Scores must be integers, so the 'parallel' search only works
+    with an evaluation function which returns integers.
+
+    The shared memory is released by self.close, or when the table is garbage
+    collected or the program exits.
+
+    Instance Attributes:
+        - size: the number of slots, a power of 2
+        - replacement: the replacement policy
+        - name: the name of the shared memory
+        - age: the number of calls of self.new_search
+        - probes, hits, collisions, stores, evictions: the statistics of
+            this process
+    """
+    size: int
+    replacement: str
+    name: str
+    age: int
+
+    def __init__(self, size: int = 1 << 18, replacement: str = 'age', name: str = None) -> None:
+        """Create the table with at least size slots, or attach to the table
+        with the shared memory name"""
+        if replacement not in REPLACEMENT_POLICIES:
+            raise ValueError(f'unknown replacement policy {replacement}')
+        self.size = 1 << max(size - 1, 1).bit_length()
+        self.replacement = replacement
+        self._owner = name is None
+        if self._owner:
+            self._memory = shared_memory.SharedMemory(create=True, size=self.size * 16)
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+        self.name = self._memory.name
+        self._words = self._memory.buf.cast('Q')
+        if self._owner:
+            for i in range(self.size * 2):
+                self._words[i] = 0
+        self.age = 0
+        self.probes, self.hits, self.collisions = 0, 0, 0
+        self.stores, self.evictions = 0, 0
+        self._finalizer = weakref.finalize(self, _release_memory, self._words,
+                                           self._memory, self._owner)
+
+    def new_search(self) -> None:
+        """mark the entries stored so far as old"""
+        self.age += 1
+
+    def lookup(self, key: int) -> any:
+        """return (depth, score, flag, move) of the position with hash key,
+        or None if the position is not in the table"""
+        self.probes += 1
+        i = (key & (self.size - 1)) * 2
+        data = self._words[i + 1]
+        if self._words[i] ^ data == key:
+            self.hits += 1
+            return unpack_entry(data)[:4]
+        if data:
+            self.collisions += 1
+        return None
+
+    def store(self, key: int, depth: int, score: float, flag: int, move: any) -> None:
+        """store the result of searching the position with hash key"""
+        i = (key & (self.size - 1)) * 2
+        old_data = self._words[i + 1]
+        if old_data:
+            old_depth, _, _, _, old_age = unpack_entry(old_data)
+            same_age = old_age == self.age & 0xFF
+            if self._words[i] ^ old_data != key:
+                if self.replacement == 'depth' and depth < old_depth:
+                    return
+                if self.replacement == 'age' and same_age and depth < old_depth:
+                    return
+                self.evictions += 1
+            elif depth < old_depth and same_age:
+                return
+        self.stores += 1
+        data = pack_entry(depth, score, flag, move, self.age)
+        self._words[i] = key ^ data
+        self._words[i + 1] = data
+
+    def hit_rate(self) -> float:
+        """return the fraction of lookups which found the position"""
+        return self.hits / self.probes if self.probes else 0.0
+
+    def collision_rate(self) -> float:
+        """return the fraction of lookups which found a different position"""
+        return self.collisions / self.probes if self.probes else 0.0
+
+    def statistics(self) -> dict:
+        """return the statistics of the table in this process"""
+        return {'size': self.size,
+                'probes': self.probes,
+                'hits': self.hits,
+                'collisions': self.collisions,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'hit_rate': self.hit_rate(),
+                'collision_rate': self.collision_rate()}
+
+    def close(self) -> None:
+        """detach from the shared memory, and remove it if this process created it"""
+        self._finalizer()
+
+
+def _release_memory(words: memoryview, memory: shared_memory.SharedMemory, owner: bool) -> None:
+    """release the view of the shared memory, detach from it and remove it if
+    owner, the view must be released before the memory can be closed"""
+    words.release()
+    memory.close()
+    if owner:
+        memory.unlink()
+
+
+def _stop_workers(pool: any, table: SharedTranspositionTable) -> None:
+    """stop the worker processes of pool and remove the shared table"""
+    pool.terminate()
+    pool.join()
+    table.close()
+
+
+# the table of a worker process
+_worker_table = None
+
+
+def _attach_table(name: str, size: int, replacement: str) -> None:
+    """attach the worker process to the shared table"""
+    global _worker_table
+    _worker_table = SharedTranspositionTable(size, replacement, name)
+
+
+def _search_move(task: tuple) -> tuple[tuple, float, int]:
+    """return the move, its exact score and the number of searched nodes"""
+    game, move, depth, evaluate, age = task
+    _worker_table.age = age
+    searcher = AlphaBetaSearch(game.is_black_move, evaluate, table=_worker_table)
+    game.push(move)
+    score = -searcher.search(game, depth - 1, -INFINITY, INFINITY)
+    return move, score, searcher.nodes
+
+
+class ParallelSearch:
+    """The root splitting alpha-beta search on a process pool
+
+    Every move of the current player is searched with a full window by one
+    of the workers, so the best move is the same as the serial search.
+    The workers and the shared table are stopped by self.close, or when the
+    search is garbage collected or the program exits.
+
+    Instance Attributes:
+        - workers: the number of worker processes
+        - table: the transposition table shared by the workers
+        - nodes: the number of positions searched by the last search
+        - elapsed: the time of the last search in seconds
+    """
+    workers: int
+    table: SharedTranspositionTable
+    nodes: int
+    elapsed: float
+
+    def __init__(self, workers: int = None, table_size: int = 1 << 18,
+                 replacement: str = 'age') -> None:
+        self.workers = workers or multiprocessing.cpu_count()
+        self.table = SharedTranspositionTable(table_size, replacement)
+        self._pool = multiprocessing.Pool(self.workers, initializer=_attach_table,
+                                          initargs=(self.table.name, self.table.size,
+                                                    replacement))
+        self.nodes = 0
+        self.elapsed = 0.0
+        self._finalizer = weakref.finalize(self, _stop_workers, self._pool, self.table)
+
+    def search_root(self, game: Reversi, depth: int, evaluate: callable) -> tuple[any, float]:
+        """return the best move and its score for the current player,
+        the first one in game.valid_moves among the moves with the best score"""
+        start_time = time.perf_counter()
+        self.table.new_search()
+        tasks = [(game, move, depth, evaluate, self.table.age & 0xFF)
+                 for move in game.valid_moves]
+        results = {}
+        self.nodes = 1
+        for move, score, nodes in self._pool.imap_unordered(_search_move, tasks):
+            results[move] = score
+            self.nodes += nodes
+        best_move, best_score = None, -INFINITY
+        for move in game.valid_moves:
+            if results[move] > best_score:
+                best_move, best_score = move, results[move]
+        self.elapsed = time.perf_counter() - start_time
+        return best_move, best_score
+
+    def close(self) -> None:
+        """stop the workers and remove the shared table"""
+        self._finalizer()
+
+    def __enter__(self) -> any:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def measure_speedup(game: Reversi, depth: int, evaluate: callable, workers: int = None) -> dict:
+    """return the time and the nodes of the serial alpha-beta search of game,
+    AlphaBetaSearch.search_root on one core, and of the parallel search with
+    workers workers, and the speedup of the parallel search"""
+    searcher = AlphaBetaSearch(game.is_black_move, evaluate)
+    start_time = time.perf_counter()
+    searcher.search_root(game.copy_board(), depth)
+    serial = {'time': time.perf_counter() - start_time, 'nodes': searcher.nodes}
+    with ParallelSearch(workers) as parallel_search:
+        parallel_search.search_root(game.copy_board(), depth, evaluate)
+        parallel = {'time': parallel_search.elapsed, 'nodes': parallel_search.nodes,
+                    'workers': parallel_search.workers}
+    return {'serial': serial, 'parallel': parallel, 'speedup': serial['time'] / parallel['time']}
+
+
+if __name__ == '__main__':
+    from reversi_player import evaluate_score_by_position
+    from reversi_bitboard import BitboardReversi
+    print(measure_speedup(BitboardReversi(), 7, evaluate_score_by_position))
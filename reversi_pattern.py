@@ -0,0 +1,221 @@
+"""CSC111 Final Project: AI Player for Reversi
+
+Instructions:
+This Python module contains the pattern evaluation function. The board
+is read as a few lines of squares, the patterns: the 4 edges, the 4
+3x3 corners and the 2 diagonals. Each pattern instance is given a base-3
+index of its squares (0 for white, 1 for empty, 2 for black), and the
+score of the instance is looked up in the weight table of the pattern for
+the phase of the game, the number of empty squares. The difference of the
+mobility of the players is added with a weight for the phase.
+
+The index of an instance is 3 ** n // 2 plus the sum of 3 ** i of the black
+squares minus that of the white squares, so it is an incremental term of
+reversi_board (see make_term). The nested list games searched with this
+evaluation keep the terms PATTERN_TERMS up to date when a move is made, and
+evaluating them only looks the terms up.
+
+The weight tables are computed when the evaluation is first used, from
+the value of each square, the corners next to the C and X squares and
+the discs of an edge which are next to the corner.
+
+Copyright and Usage Information:
+This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
+"""
+from array import array
+from itertools import product
+from reversi_board import Reversi, BLACK_PIECE, WHITE_PIECE, make_term
+from reversi_bitboard import BitboardReversi, bits_to_squares
+
+# the squares row * 8 + column of the instances of each pattern. The first
+# instance is the canonical one, the others are its reflections, with the
+# squares in the matching order, so the instances of a pattern share a table.
+PATTERNS = {
+    'edge': [[c for c in range(8)],
+             [56 + c for c in range(8)],
+             [r * 8 for r in range(8)],
+             [r * 8 + 7 for r in range(8)]],
+    'corner': [[r * 8 + c for r in range(3) for c in range(3)],
+               [r * 8 + 7 - c for r in range(3) for c in range(3)],
+               [(7 - r) * 8 + c for r in range(3) for c in range(3)],
+               [(7 - r) * 8 + 7 - c for r in range(3) for c in range(3)]],
+    'diagonal': [[i * 9 for i in range(8)],
+                 [i * 8 + 7 - i for i in range(8)]],
+}
+
+# the patterns are weighted by phase, phase min(empties // PHASE_EMPTIES, PHASES - 1)
+PHASES = 6
+PHASE_EMPTIES = 10
+
+# the weights of the squares, the discs and the mobility for each phase,
+# from the endgame (phase 0) to the opening
+SQUARE_SCALE = [1, 2, 3, 3, 3, 3]
+DISC_SCALE = [4, 2, 1, 0, 0, 0]
+MOBILITY_WEIGHT = [1, 3, 4, 5, 5, 5]
+
+CORNER_VALUE = 20
+EDGE_VALUE = 3
+INNER_VALUE = 1
+C_SQUARE_VALUE = -6
+X_SQUARE_VALUE = -12
+NEXT_TO_CORNER_VALUE = 3
+STABLE_VALUE = 4
+
+# the incremental terms of all instances, INSTANCE_TERMS[name] are the indices
+# in PATTERN_TERMS and Reversi.terms of the instances of the pattern name, and
+# the offset 3 ** n // 2 turns a term into the index of its table
+PATTERN_TERMS = tuple(make_term([[3 ** instance.index(row * 8 + column)
+                                  if row * 8 + column in instance else 0
+                                  for column in range(8)] for row in range(8)])
+                      for instances in PATTERNS.values() for instance in instances)
+_term_indices = iter(range(len(PATTERN_TERMS)))
+INSTANCE_TERMS = {name: [next(_term_indices) for _ in instances]
+                  for name, instances in PATTERNS.items()}
+OFFSETS = {name: 3 ** len(instances[0]) // 2 for name, instances in PATTERNS.items()}
+
+# SQUARE_TERMS[row * 8 + column] is the list of (term, 3 ** i) of the
+# instances with the square at i, and PATTERN_MASK is the bitboard of the
+# squares of all instances
+SQUARE_TERMS = [[(term, 3 ** instance.index(square))
+                 for name, instances in PATTERNS.items()
+                 for term, instance in zip(INSTANCE_TERMS[name], instances)
+                 if square in instance]
+                for square in range(64)]
+PATTERN_MASK = sum(1 << square for square in range(64) if SQUARE_TERMS[square])
+
+# TABLES[phase][name] is the weight table of the pattern name in phase
+TABLES = []
+
+
+def nearest_corner(square: int) -> int:
+    """return the corner nearest to square"""
+    row, column = square // 8, square % 8
+    return (0 if row < 4 else 56) + (0 if column < 4 else 7)
+
+
+def square_values(squares: list[int]) -> list[tuple[int, int, int]]:
+    """return (value, value if the corner is empty, i) for each square of an
+    instance, where i is the position of its corner in squares, or -1 if the
+    value does not depend on the corner"""
+    values = []
+    for square in squares:
+        corner = nearest_corner(square)
+        row, column = square // 8, square % 8
+        distance = (abs(row - corner // 8), abs(column - corner % 8))
+        if distance == (0, 0):
+            values.append((CORNER_VALUE, CORNER_VALUE, -1))
+        elif distance in {(0, 1), (1, 0), (1, 1)} and corner in squares:
+            empty_corner_value = X_SQUARE_VALUE if distance == (1, 1) else C_SQUARE_VALUE
+            values.append((NEXT_TO_CORNER_VALUE, empty_corner_value, squares.index(corner)))
+        elif row in (0, 7) or column in (0, 7):
+            values.append((EDGE_VALUE, EDGE_VALUE, -1))
+        else:
+            values.append((INNER_VALUE, INNER_VALUE, -1))
+    return values
+
+
+def stable_discs(pieces: tuple[int]) -> int:
+    """return the number of black discs minus white discs of an edge which are
+    in a line of the same colour from a corner, and can not be reversed.
+    pieces are the pieces of the edge, 1 for black, -1 for white, 0 for empty"""
+    stable = 0
+    for line in (pieces, pieces[::-1]):
+        for piece in line:
+            if piece != line[0]:
+                break
+            stable += piece
+    return stable
+
+
+def build_tables() -> None:
+    """compute the weight tables of all patterns and phases, indexed by
+    the base-3 index of the instance"""
+    if TABLES:
+        return
+    tables = [{} for _ in range(PHASES)]
+    for name, instances in PATTERNS.items():
+        squares = instances[0]
+        values = square_values(squares)
+        phase_tables = [array('i', [0]) * 3 ** len(squares) for _ in range(PHASES)]
+        # the index is the sum of (piece + 1) * 3 ** i of square i, so the
+        # pieces from product are reversed, the last square first
+        for index, reversed_pieces in enumerate(product((-1, 0, 1), repeat=len(squares))):
+            pieces = reversed_pieces[::-1]
+            position = 0
+            for piece, (value, empty_corner_value, corner) in zip(pieces, values):
+                if piece != 0:
+                    position += piece * (empty_corner_value if corner >= 0
+                                         and pieces[corner] == 0 else value)
+            if name == 'edge':
+                position += STABLE_VALUE * stable_discs(pieces)
+            discs = sum(pieces)
+            for phase in range(PHASES):
+                phase_tables[phase][index] = SQUARE_SCALE[phase] * position \
+                    + DISC_SCALE[phase] * discs
+        for phase in range(PHASES):
+            tables[phase][name] = phase_tables[phase]
+    TABLES.extend(tables)
+
+
+def instance_terms(game: Reversi) -> any:
+    """return the terms of the pattern instances of game by their index in
+    PATTERN_TERMS, which are computed from the board for a BitboardReversi or
+    a Reversi without the terms"""
+    if not isinstance(game, BitboardReversi) and game.term_weights == PATTERN_TERMS:
+        return game.terms
+    if isinstance(game, BitboardReversi):
+        black, white = game.black, game.white
+    else:
+        black = sum(1 << s for s, piece in enumerate(game.cells) if piece == BLACK_PIECE)
+        white = sum(1 << s for s, piece in enumerate(game.cells) if piece == WHITE_PIECE)
+    terms = [0] * len(PATTERN_TERMS)
+    for square in bits_to_squares(black & PATTERN_MASK):
+        for term, power in SQUARE_TERMS[square]:
+            terms[term] += power
+    for square in bits_to_squares(white & PATTERN_MASK):
+        for term, power in SQUARE_TERMS[square]:
+            terms[term] -= power
+    return terms
+
+
+def evaluate_score_by_pattern(game: Reversi, for_black: bool) -> int:
+    """return the pattern score of game for black player if for_black,
+    otherwise for white player"""
+    if not TABLES:
+        build_tables()
+    empties = 64 - game.black_score - game.white_score
+    phase = min(empties // PHASE_EMPTIES, PHASES - 1)
+    tables = TABLES[phase]
+    terms = instance_terms(game)
+    score = 0
+    for name, pattern_terms in INSTANCE_TERMS.items():
+        table, offset = tables[name], OFFSETS[name]
+        for term in pattern_terms:
+            score += table[offset + terms[term]]
+    score += MOBILITY_WEIGHT[phase] * (game.mobility(True) - game.mobility(False))
+    return score if for_black else -score
+
+
+# the games searched with evaluate_score_by_pattern keep its terms, see
+# reversi_player.MiniMaxPlayer.search_game
+evaluate_score_by_pattern.terms = PATTERN_TERMS
+
+
+if __name__ == '__main__':
+    import time
+    from reversi_player import MiniMaxPlayer, evaluate_score_by_position
+    start_time = time.time()
+    build_tables()
+    print(f'the tables are built in {time.time() - start_time:.2f} seconds')
+    wins = {'pattern': 0, 'position': 0}
+    for pattern_is_black in (True, False):
+        r = BitboardReversi()
+        pattern = MiniMaxPlayer(r, 3, 99, evaluate_score_by_pattern, search='alphabeta')
+        position = MiniMaxPlayer(r, 3, 99, evaluate_score_by_position, search='alphabeta')
+        while r.winner() is None:
+            is_pattern = r.is_black_move == pattern_is_black
+            r.make_move(pattern.think_move() if is_pattern else position.think_move())
+        if r.winner() != 'TIE':
+            wins['pattern' if (r.winner() == 'BLACK PLAYER') == pattern_is_black
+                 else 'position'] += 1
+    print('depth 3 games won by each evaluation:', wins)
@@ -8,10 +8,16 @@ of a certain board situation
 Copyright and Usage Information:
 This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
 """
-from reversi_board import Reversi, WHITE_PIECE, BLACK_PIECE
+from reversi_board import Reversi, WHITE_PIECE, BLACK_PIECE, make_term
+from reversi_bitboard import BitboardReversi
 import random
 from reversi_game_tree import GameTree, START
+from reversi_endgame import EndgameSolver, count_empties
+from reversi_transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from reversi_statistics import SearchStatistics
 import time
+import json
+import os
 
 WEIGHT = [[5, 1, 2, 2, 2, 2, 1, 5],
           [1, 1, 1, 1, 1, 1, 1, 1],
@@ -22,6 +28,42 @@ WEIGHT = [[5, 1, 2, 2, 2, 2, 1, 5],
           [1, 1, 1, 1, 1, 1, 1, 1],
           [5, 1, 2, 2, 2, 2, 1, 5]]
 
+# the weight of the difference of the number of valid moves of the players
+# in evaluate_score_by_position
+MOBILITY_WEIGHT = 0
+
+# the weight file written by reversi_tuner, which replaces WEIGHT and
+# MOBILITY_WEIGHT at startup. It is only loaded when the environment
+# variable REVERSI_WEIGHTS names it, so the default evaluation, and the
+# opening books and benchmark baselines made with it, never change silently
+WEIGHT_FILE = os.environ.get('REVERSI_WEIGHTS')
+
+
+def load_weights(path: str) -> tuple[list[list[int]], int]:
+    """return the square weights and the mobility weight of the weight file"""
+    with open(path) as weight_file:
+        weights = json.load(weight_file)
+    weight = weights['weight']
+    if len(weight) != 8 or any(len(row) != 8 for row in weight):
+        raise ValueError(f'{path} does not have an 8x8 weight table')
+    return [[int(w) for w in row] for row in weight], int(weights.get('mobility', 0))
+
+
+if WEIGHT_FILE:
+    WEIGHT, MOBILITY_WEIGHT = load_weights(WEIGHT_FILE)
+
+# (weight, bitboard of the squares with the weight) for BitboardReversi
+WEIGHT_MASKS = [(w, sum(1 << (row * 8 + column) for row in range(8) for column in range(8)
+                        if WEIGHT[row][column] == w))
+                for w in sorted({w for row in WEIGHT for w in row})]
+
+# the incremental term of the weighted score of WEIGHT, which the nested
+# list games searched with evaluate_score_by_position keep in Reversi.terms
+POSITION_TERMS = (make_term(WEIGHT),)
+
+CORNERS = {(0, 0), (0, 7), (7, 0), (7, 7)}
+INFINITY = float('inf')
+
 
 class Player:
     """The abstract class of player"""
@@ -36,6 +78,13 @@ class Player:
         """Think a new move based on current situation"""
         raise NotImplementedError
 
+    def stop(self) -> None:
+        """stop the running think_move from another thread as soon as it can,
+        the players which always think quickly ignore it"""
+
+    def close(self) -> None:
+        """release the processes and the memory of the player, if any"""
+
 
 class RandomPlayer(Player):
     """The player who make random move"""
@@ -54,41 +103,306 @@ class MiniMaxPlayer(Player):
         - think_time: maximum time to generate game tree in seconds.
         - evaluate_algorithm: the evaluation function for AI player to
             understand the situation of the board.
+        - bitboard: true iff the game tree is generated on a BitboardReversi
+            copy of the game, which is much faster than the nested list board.
+        - search: 'minimax' to generate the full game tree then apply minimax,
+            'alphabeta' for a depth first alpha-beta search which does not
+            build the game tree and gives the same move as 'minimax', or
+            'iterative' for alpha-beta searches of depth 1, 2, ... self.depth
+            until think_time runs out, using the move of the last completed depth,
+            or 'parallel' for the alpha-beta search with the moves split among
+            workers processes sharing one transposition table.
+        - workers: the number of processes of the 'parallel' search, None for
+            the number of cores
+        - book: the opening book which is looked up before searching, or None
+        - endgame: the player solves the game exactly instead of searching to
+            self.depth when the number of empty squares is at most endgame,
+            0 to never solve exactly
+        - endgame_exact: true iff the endgame solver maximises the final disc
+            difference, otherwise it only finds a win, draw or loss, which is faster
+        - batch: true iff the 'alphabeta' and 'iterative' search evaluate the
+            children of a position together with the batched evaluation
+            function of reversi_batch, which needs numpy. It is ignored if
+            the evaluation function has no batched version.
+        - table: the transposition table used by 'alphabeta' and 'iterative'
+            search for all moves of the player, or None.
+        - reuse_tree: true iff the 'minimax' search keeps the game tree after
+            its move and, when the game reaches one of the positions in it,
+            only extends the tree from there instead of generating it again.
+        - last_tree: the subtree of the last move of the player, or None
+        - last_game: the game after the last move of the player, or None
+        - profile: true iff the statistics of each search include the times
+            of its parts, which makes the search a little slower
+        - on_statistics: the function called with the statistics of each
+            search, for example a reversi_statistics.JsonLinesWriter, or None
+        - statistics: the statistics of the last search, or None
     """
 
     game: Reversi
     depth: int
     think_time: int
     evaluate_algorithm: callable
+    bitboard: bool
+    search: str
+    table: any
+    reuse_tree: bool
+    last_tree: any
+    last_game: any
+    workers: any
+    batch: bool
+    book: any
+    endgame: int
+    endgame_exact: bool
+    profile: bool
+    on_statistics: any
+    statistics: any
 
-    def __init__(self, game: Reversi, depth: int, think_time: int, evaluate: callable) -> None:
+    def __init__(self, game: Reversi, depth: int, think_time: int, evaluate: callable,
+                 bitboard: bool = False, search: str = 'minimax',
+                 table: TranspositionTable = None, reuse_tree: bool = True,
+                 workers: int = None, batch: bool = False, book: any = None,
+                 endgame: int = 0, endgame_exact: bool = True,
+                 profile: bool = False, on_statistics: callable = None) -> None:
         """Initialize the player"""
         super().__init__(game)
+        if search not in {'minimax', 'alphabeta', 'iterative', 'parallel'}:
+            raise ValueError(f'unknown search {search}')
         self.think_time = think_time
         self.depth = depth
         self.evaluate_algorithm = evaluate
+        self.bitboard = bitboard
+        self.search = search
+        self.table = table
+        self.reuse_tree = reuse_tree
+        self.last_tree = None
+        self.last_game = None
+        self.workers = workers
+        self._parallel_search = None
+        self.batch = batch
+        self.book = book
+        self.endgame = endgame
+        self.endgame_exact = endgame_exact
+        self.profile = profile
+        self.on_statistics = on_statistics
+        self.statistics = None
+        self._searcher = None
+        self._stats = None
+        self._stopped = False
 
-    def generate_tree(self) -> GameTree:
+    def search_game(self) -> any:
+        """return a copy of the game for the search to make and undo moves on,
+        which keeps the incremental terms of the evaluation function, if any,
+        given by its terms attribute"""
+        if self.bitboard:
+            return BitboardReversi.from_game(self.game)
+        return self.game.copy_board(term_weights=getattr(self.evaluate_algorithm, 'terms', ()))
+
+    def generate_tree(self, stats: SearchStatistics = None) -> GameTree:
         """get full tree of moves"""
         start_time = time.time()
+        if stats is None:
+            stats = SearchStatistics('minimax')
         return generate_game_tree(START,
-                                  self.game,
+                                  stats.copy(self.search_game),
                                   self.depth,
                                   start_time,
                                   self.think_time,
                                   self.game.is_black_move,
-                                  self.evaluate_algorithm)
+                                  stats.timed(self.evaluate_algorithm),
+                                  stats)
+
+    def reuse_last_tree(self, stats: SearchStatistics = None) -> any:
+        """return the tree of the current game extended from the subtree of
+        self.last_tree reached by the reply of the opponent, or None if the
+        current game is not in self.last_tree"""
+        if self.last_tree is None:
+            return None
+        if stats is None:
+            stats = SearchStatistics('minimax')
+        for subtree in self.last_tree.sub_trees:
+            self.last_game.push(subtree.move)
+            is_current = self.last_game.hash == self.game.hash \
+                and self.last_game.board == self.game.board
+            self.last_game.pop()
+            if is_current:
+                extend_game_tree(subtree,
+                                 stats.copy(self.search_game),
+                                 self.depth,
+                                 time.time(),
+                                 self.think_time,
+                                 self.game.is_black_move,
+                                 stats.timed(self.evaluate_algorithm),
+                                 stats)
+                return subtree
+        return None
+
+    def remember_tree(self, game_tree: GameTree, move: tuple) -> None:
+        """keep the subtree of move for the next call of self.think_move"""
+        if not self.reuse_tree:
+            return
+        self.last_tree = game_tree.find_subtree_by_move(move)
+        self.last_game = self.search_game()
+        self.last_game.push(move)
+
+    def parallel_search(self) -> any:
+        """return the process pool of the 'parallel' search, started on first use"""
+        if self._parallel_search is None:
+            from reversi_parallel import ParallelSearch
+            self._parallel_search = ParallelSearch(self.workers)
+        return self._parallel_search
+
+    def close(self) -> None:
+        """stop the processes of the 'parallel' search"""
+        if self._parallel_search is not None:
+            self._parallel_search.close()
+            self._parallel_search = None
+
+    def new_searcher(self, stats: SearchStatistics = None) -> any:
+        """return the alpha-beta search for the current move, whose evaluations
+        are timed in stats if it is profiled"""
+        if self.table is not None:
+            self.table.new_search()
+        if stats is None:
+            stats = SearchStatistics('alphabeta')
+        batch_evaluate = None
+        if self.batch:
+            from reversi_batch import BATCH_EVALUATORS
+            batch_evaluate = BATCH_EVALUATORS.get(self.evaluate_algorithm)
+            if batch_evaluate is not None:
+                batch_evaluate = stats.timed(batch_evaluate)
+        searcher = AlphaBetaSearch(self.game.is_black_move, stats.timed(self.evaluate_algorithm),
+                                   table=self.table, batch_evaluate=batch_evaluate, stats=stats)
+        if self._stopped:
+            searcher.deadline = 0
+        self._searcher = searcher
+        return searcher
+
+    def stop(self) -> None:
+        """stop the running search from another thread. The 'alphabeta' and
+        'iterative' searches raise SearchTimeout at their next position, the
+        'alphabeta' search then returns the best move it knows and the
+        'iterative' search the move of the last completed depth. The 'minimax'
+        search stops generating the game tree and uses the tree it has."""
+        self._stopped = True
+        searcher, stats = self._searcher, self._stats
+        if searcher is not None:
+            searcher.deadline = 0
+        if stats is not None:
+            stats.timed_out = True
+
+    def iterative_deepening(self, stats: SearchStatistics = None) -> any:
+        """return the best move of the deepest alpha-beta search completed in
+        think_time seconds. The search of each depth tries the best line of the
+        previous depth first. Depth 1 is always completed."""
+        searcher = self.new_searcher(stats)
+        stats = searcher.stats
+        deadline = time.time() + self.think_time
+        best_move, pv = None, None
+        for depth in range(1, self.depth + 1):
+            try:
+                move, score, pv = searcher.search_root(stats.copy(self.search_game), depth, pv)
+            except SearchTimeout:
+                stats.timed_out = True
+                break
+            best_move = move
+            stats.completed_depth, stats.score = depth, score
+            if searcher.deadline is None:
+                # the deadline of self.stop is kept
+                searcher.deadline = deadline
+            if time.time() > deadline:
+                stats.timed_out = depth < self.depth
+                break
+        return best_move
 
     def think_move(self) -> tuple[int]:
-        """Make move by minimax algorithm"""
-        game_tree = self.generate_tree()
+        """Make move by minimax algorithm, and keep the statistics of the
+        search in self.statistics"""
+        start_time = time.perf_counter()
+        stats = SearchStatistics(self.search, self.depth, self.profile)
+        # a stop only stops the search it was called during
+        self._stopped, self._stats = False, stats
+        try:
+            move = self.find_move(stats)
+        finally:
+            self._searcher, self._stats = None, None
+        stats.move = move
+        stats.total_time = time.perf_counter() - start_time
+        self.statistics = stats
+        if self.on_statistics is not None:
+            self.on_statistics(stats)
+        return move
+
+    def find_move(self, stats: SearchStatistics) -> tuple[int]:
+        """return the move of the search, and record the search in stats"""
+        if self.book is not None:
+            entry = self.book.lookup(self.game)
+            if entry is not None:
+                stats.search, stats.score = 'book', entry[1]
+                return entry[0]
+
+        empties = count_empties(self.game)
+        if empties <= self.endgame and self.game.valid_moves != []:
+            solver = EndgameSolver()
+            move, stats.score = solver.solve(self.game, self.endgame_exact)
+            stats.search, stats.nodes = 'endgame', solver.nodes
+            stats.depth = stats.completed_depth = empties
+            return move
+
+        if self.search == 'alphabeta':
+            searcher = self.new_searcher(stats)
+            if self.depth > 0:
+                try:
+                    move, stats.score, _ = searcher.search_root(stats.copy(self.search_game),
+                                                                self.depth)
+                except SearchTimeout:
+                    # stopped by self.stop, the move of the table is the best
+                    # line of an earlier search
+                    stats.timed_out = True
+                    move = searcher.table_move(self.game)
+                    return self.game.valid_moves[0] if move is None else move
+                stats.completed_depth = self.depth
+                if move is not None:
+                    return move
+            stats.search = 'random'
+            return random.choice(self.game.valid_moves)
+
+        if self.search == 'parallel':
+            if self.depth > 0:
+                parallel_search = self.parallel_search()
+                # the moves are made by the worker processes, so they are not timed
+                move, stats.score = parallel_search.search_root(
+                    stats.copy(self.search_game, time_moves=False), self.depth,
+                    self.evaluate_algorithm)
+                stats.nodes, stats.completed_depth = parallel_search.nodes, self.depth
+                if move is not None:
+                    return move
+            stats.search = 'random'
+            return random.choice(self.game.valid_moves)
+
+        if self.search == 'iterative':
+            move = self.iterative_deepening(stats)
+            if move is not None:
+                return move
+            stats.search = 'random'
+            return random.choice(self.game.valid_moves)
+
+        stats.completed_depth = self.depth
+        game_tree = None
+        if self.reuse_tree:
+            game_tree = self.reuse_last_tree(stats)
+        if game_tree is None:
+            game_tree = self.generate_tree(stats)
         apply_minimax(game_tree, game_tree.is_black_move)
         if game_tree.sub_trees != []:
             score = game_tree.score
+            stats.score = score
             for s in game_tree.sub_trees:
                 if s.score == score:
                     # print('MiniMax Player though 1 move')
+                    self.remember_tree(game_tree, s.move)
                     return s.move
+        self.last_tree = None
+        stats.search = 'random'
         return random.choice(self.game.valid_moves)
 
 
@@ -103,31 +417,305 @@ def apply_minimax(game_tree: GameTree, is_black_move: bool) -> None:
             game_tree.score = min(s.score for s in game_tree.sub_trees)
 
 
+class SearchTimeout(Exception):
+    """Raised when the alpha-beta search runs past its deadline"""
+
+
+class AlphaBetaSearch:
+    """The depth first negamax alpha-beta search
+
+    The scores are for the current player of the searched position while
+    the leaves are evaluated for the player is_black_move, the same as
+    generate_game_tree, so the result equals the minimax score.
+
+    Instance Attributes:
+        - is_black_move: true iff the search is for black player
+        - evaluate: the evaluation function of the leaves
+        - deadline: the time.time() when the search raises SearchTimeout,
+            or None for no limit
+        - table: the transposition table of searched positions, or None.
+            The scores depend on is_black_move and evaluate, so a table must
+            only be shared by searches with the same is_black_move and evaluate.
+        - batch_evaluate: the batched version of evaluate from reversi_batch, or
+            None. If given, the children of a position are evaluated with one
+            call of batch_evaluate instead of one call of evaluate each.
+        - stats: the statistics of all searches of this object
+    """
+    is_black_move: bool
+    evaluate: callable
+    deadline: any
+    table: any
+    batch_evaluate: any
+    stats: SearchStatistics
+
+    def __init__(self, is_black_move: bool, evaluate: callable, deadline: any = None,
+                 table: TranspositionTable = None, batch_evaluate: callable = None,
+                 stats: SearchStatistics = None) -> None:
+        self.is_black_move = is_black_move
+        self.evaluate = evaluate
+        self.deadline = deadline
+        self.table = table
+        self.batch_evaluate = batch_evaluate
+        self.stats = SearchStatistics('alphabeta') if stats is None else stats
+
+    @property
+    def nodes(self) -> int:
+        """the number of positions searched"""
+        return self.stats.nodes
+
+    def search_root(self, game: Reversi, depth: int,
+                    pv: list = None) -> tuple[any, float, list]:
+        """return the best move, its score and the best line of moves
+
+        Among the moves with the best score, return the first one in game.valid_moves,
+        which is the same move as MiniMaxPlayer chooses with the full game tree.
+        A move that comes before the best move so far is searched with a window
+        one below the best score, so that a tie with it can be found.
+        pv is the best line of a previous search which is tried first.
+        """
+        index = {m: i for i, m in enumerate(game.valid_moves)}
+        best_move, best_score, best_line = None, -INFINITY, []
+        first = pv[0] if pv else self.table_move(game)
+        stats = self.stats
+        ply = stats.ply
+        for move in self.order_moves(game, depth, first):
+            stats.ply = ply + 1
+            game.push(move)
+            line = []
+            child_pv = pv[1:] if pv and pv[0] == move else None
+            if best_move is not None and index[move] < index[best_move]:
+                score = -self.search(game, depth - 1, -INFINITY, -(best_score - 1),
+                                     child_pv, line)
+                is_better = score >= best_score
+            else:
+                score = -self.search(game, depth - 1, -INFINITY, -best_score,
+                                     child_pv, line)
+                is_better = score > best_score
+            game.pop()
+            stats.ply = ply
+            if best_move is None or is_better:
+                best_move, best_score, best_line = move, score, [move] + line
+        return best_move, best_score, best_line
+
+    def search(self, game: Reversi, depth: int, alpha: float, beta: float,
+               pv: list = None, line: list = None) -> float:
+        """return the score of game for the current player
+        line is filled with the best line of moves from game"""
+        if self.deadline is not None and time.time() > self.deadline:
+            raise SearchTimeout
+
+        # the statistics are counted here, the moves and the evaluations of a
+        # profiled search are timed by the game and the evaluation function
+        # MiniMaxPlayer gives to the search
+        stats = self.stats
+        ply = stats.ply
+        stats.nodes += 1
+        if ply > stats.max_ply:
+            stats.max_ply = ply
+
+        if depth == 0 or game.valid_moves == []:
+            stats.leaves += 1
+            stats.evaluations += 1
+            score = self.evaluate(game, self.is_black_move)
+            return score if game.is_black_move == self.is_black_move else -score
+
+        table_move = None
+        if self.table is not None:
+            stats.table_probes += 1
+            entry = self.table.lookup(game.hash)
+            if entry is not None:
+                stats.table_hits += 1
+                entry_depth, score, flag, table_move = entry
+                if entry_depth >= depth and (flag == EXACT
+                                             or (flag == LOWER_BOUND and score >= beta)
+                                             or (flag == UPPER_BOUND and score <= alpha)):
+                    stats.table_cutoffs += 1
+                    if line is not None and table_move is not None:
+                        line[:] = [table_move]
+                    return score
+
+        stats.expanded += 1
+        stats.moves += len(game.valid_moves)
+
+        leaf_scores = None
+        if depth == 1 and self.batch_evaluate is not None:
+            leaf_scores = self.evaluate_children(game)
+
+        original_alpha = alpha
+        best_move = None
+        child_line = []
+        for move in self.order_moves(game, depth, pv[0] if pv else table_move):
+            child_line.clear()
+            if leaf_scores is not None:
+                stats.nodes += 1
+                stats.leaves += 1
+                stats.max_ply = max(stats.max_ply, stats.ply + 1)
+                score = leaf_scores[move]
+            else:
+                stats.ply = ply + 1
+                game.push(move)
+                child_pv = pv[1:] if pv and pv[0] == move else None
+                score = -self.search(game, depth - 1, -beta, -alpha, child_pv, child_line)
+                game.pop()
+                stats.ply = ply
+            if score > alpha:
+                alpha = score
+                best_move = move
+                if line is not None:
+                    line[:] = [move] + child_line
+                if alpha >= beta:
+                    stats.cutoffs += 1
+                    break
+
+        if self.table is not None:
+            if alpha >= beta:
+                flag = LOWER_BOUND
+            elif alpha > original_alpha:
+                flag = EXACT
+            else:
+                flag = UPPER_BOUND
+            self.table.store(game.hash, depth, alpha, flag, best_move or table_move)
+        return alpha
+
+    def evaluate_children(self, game: Reversi) -> dict:
+        """return the evaluation of the position after each valid move for the
+        current player of game, computed by one call of self.batch_evaluate"""
+        from reversi_batch import board_after, make_batch
+        boards = [board_after(game, move) for move in game.valid_moves]
+        self.stats.evaluations += len(boards)
+        scores = self.batch_evaluate(make_batch(boards), self.is_black_move).tolist()
+        if game.is_black_move != self.is_black_move:
+            scores = [-score for score in scores]
+        return dict(zip(game.valid_moves, scores))
+
+    def table_move(self, game: Reversi) -> any:
+        """return the best move of game in the transposition table, or None"""
+        if self.table is None:
+            return None
+        entry = self.table.lookup(game.hash)
+        return None if entry is None else entry[3]
+
+    def order_moves(self, game: Reversi, depth: int, first: any = None) -> list[tuple]:
+        """return the valid moves with the move first at the front, then the corners,
+        then the others sorted by the evaluation one move ahead, best first for
+        the current player. The evaluation is skipped when depth < 2 since the
+        children are leaves.
+        """
+        if depth < 2:
+            moves = sorted(game.valid_moves, key=lambda m: m not in CORNERS)
+        elif self.batch_evaluate is not None:
+            scores = self.evaluate_children(game)
+            moves = sorted(game.valid_moves, key=lambda m: (m not in CORNERS, -scores[m]))
+        else:
+            sign = 1 if game.is_black_move == self.is_black_move else -1
+            stats, evaluate = self.stats, self.evaluate
+            keys = {}
+            for move in game.valid_moves:
+                game.push(move)
+                score = evaluate(game, self.is_black_move)
+                game.pop()
+                stats.evaluations += 1
+                keys[move] = (move not in CORNERS, -sign * score)
+            moves = sorted(game.valid_moves, key=keys.__getitem__)
+        if first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+
 def generate_game_tree(move: any,
                        game: Reversi,
                        depth: int,
                        start_time: float,
                        think_time: int,
                        is_black_move: bool,
-                       evaluate: callable) -> GameTree:
+                       evaluate: callable,
+                       stats: SearchStatistics = None) -> GameTree:
     """generate game tree with all moves but no score
-    the maximum think time is think_time"""
+    the maximum think time is think_time
+    moves are made with game.push and undone with game.pop, so the game
+    is the same as before when this function returns
+    the generated positions are counted in stats if it is given"""
+    if stats is None:
+        stats = SearchStatistics('minimax')
+    # the same as AlphaBetaSearch.search, the statistics are counted here
+    ply = stats.ply
+    stats.nodes += 1
+    if ply > stats.max_ply:
+        stats.max_ply = ply
+    stats.evaluations += 1
     game_tree = GameTree(move, game.is_black_move, evaluate(game, is_black_move))
 
-    if time.time() - start_time < think_time and depth > 0:
-        for move in game.get_valid_moves():
-            sub_game = game.copy_board()
-            sub_game.make_move(move)
-            game_tree.add_subtree(generate_game_tree(move,
-                                                     sub_game,
-                                                     depth - 1,
-                                                     start_time,
-                                                     think_time,
-                                                     is_black_move,
-                                                     evaluate))
+    if depth > 0 and game.valid_moves != []:
+        if not stats.timed_out and time.time() - start_time < think_time:
+            stats.expanded += 1
+            stats.moves += len(game.valid_moves)
+            for move in game.valid_moves:
+                stats.ply = ply + 1
+                game.push(move)
+                game_tree.add_subtree(generate_game_tree(move,
+                                                         game,
+                                                         depth - 1,
+                                                         start_time,
+                                                         think_time,
+                                                         is_black_move,
+                                                         evaluate,
+                                                         stats))
+                game.pop()
+                stats.ply = ply
+            return game_tree
+        stats.timed_out = True
+        stats.completed_depth = min(stats.completed_depth, ply)
+    stats.leaves += 1
     return game_tree
 
 
+def extend_game_tree(game_tree: GameTree,
+                     game: Reversi,
+                     depth: int,
+                     start_time: float,
+                     think_time: int,
+                     is_black_move: bool,
+                     evaluate: callable,
+                     stats: SearchStatistics = None) -> None:
+    """extend the leaves of game_tree, which is the tree of game, so that it
+    is the same as the tree generated by generate_game_tree with depth.
+    the maximum think time is think_time
+    the new positions are counted in stats if it is given"""
+    if stats is None:
+        stats = SearchStatistics('minimax')
+    ply = stats.ply
+    if game_tree.sub_trees == []:
+        if depth > 0 and game.valid_moves != []:
+            if not stats.timed_out and time.time() - start_time < think_time:
+                stats.expanded += 1
+                stats.moves += len(game.valid_moves)
+                for move in game.valid_moves:
+                    stats.ply = ply + 1
+                    game.push(move)
+                    game_tree.add_subtree(generate_game_tree(move,
+                                                             game,
+                                                             depth - 1,
+                                                             start_time,
+                                                             think_time,
+                                                             is_black_move,
+                                                             evaluate,
+                                                             stats))
+                    game.pop()
+                    stats.ply = ply
+            else:
+                stats.timed_out = True
+                stats.completed_depth = min(stats.completed_depth, ply)
+    else:
+        for subtree in game_tree.sub_trees:
+            stats.ply = ply + 1
+            game.push(subtree.move)
+            extend_game_tree(subtree, game, depth - 1, start_time, think_time,
+                             is_black_move, evaluate, stats)
+            game.pop()
+            stats.ply = ply
+
+
 def evaluate_score_by_piece(game: Reversi, for_black: bool) -> int:
     """simple return the difference of the score"""
     if for_black:
@@ -136,20 +724,34 @@ def evaluate_score_by_piece(game: Reversi, for_black: bool) -> int:
 
 
 def evaluate_score_by_position(game: Reversi, for_black: bool) -> int:
-    """return the weighted score difference
+    """return the weighted score difference, which a Reversi game with the
+    terms POSITION_TERMS keeps up to date in game.terms, plus the mobility
+    difference times MOBILITY_WEIGHT
     """
-    black_score = 0
-    white_score = 0
-    for row in range(8):
-        for column in range(8):
-            if game.board[row][column] == BLACK_PIECE:
-                black_score += WEIGHT[row][column]
-            if game.board[row][column] == WHITE_PIECE:
-                white_score += WEIGHT[row][column]
+    if isinstance(game, BitboardReversi):
+        score = sum(w * ((game.black & mask).bit_count() - (game.white & mask).bit_count())
+                    for w, mask in WEIGHT_MASKS)
+    elif game.term_weights == POSITION_TERMS:
+        score = game.terms[0]
+    else:
+        # a game without the term
+        score = 0
+        board = game.board
+        for row in range(8):
+            for column in range(8):
+                if board[row][column] == BLACK_PIECE:
+                    score += WEIGHT[row][column]
+                if board[row][column] == WHITE_PIECE:
+                    score -= WEIGHT[row][column]
 
-    if for_black:
-        return black_score - white_score
-    return white_score - black_score
+    if MOBILITY_WEIGHT:
+        score += MOBILITY_WEIGHT * (game.mobility(True) - game.mobility(False))
+    return score if for_black else -score
+
+
+# the games searched with evaluate_score_by_position keep its term, see
+# MiniMaxPlayer.search_game
+evaluate_score_by_position.terms = POSITION_TERMS
 
 
 if __name__ == '__main__':
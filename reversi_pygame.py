@@ -8,16 +8,17 @@ Copyright and Usage Information:
 This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
 """
 import pygame
-from reversi_board import Reversi, BLACK_PIECE, WHITE_PIECE, EMPTY_PIECE
-from reversi_player import RandomPlayer, Player, \
-    evaluate_score_by_piece, generate_game_tree, apply_minimax
+from reversi_board import Reversi, BLACK_PIECE, EMPTY_PIECE
+from reversi_player import RandomPlayer, Player, evaluate_score_by_piece
+from reversi_engine import BackgroundEngine, BackgroundAnalysis
 from pygame.colordict import THECOLORS
 from typing import Union
-from time import sleep, time
+from time import time
 
 SCREEN_SIZE = (960, 800)  # (width, height)
 UNIT = 80
 GRID_SIDE = 60
+FRAME_RATE = 30
 
 
 def initialize_screen(screen_size: tuple[int, int], allowed: list) -> pygame.Surface:
@@ -134,75 +135,90 @@ def run_game(game: Reversi,
              time_interval: float = 1,
              player_info=None) -> None:
     """Main method for the game
-    player is either 'HUMAN' or a player object"""
+    player is either 'HUMAN' or a player object
+    the computer players think in a worker thread and ponder their replies
+    while the human thinks, the window is redrawn FRAME_RATE times a second"""
     screen = initialize_screen(SCREEN_SIZE, [pygame.MOUSEBUTTONDOWN])
+    clock = pygame.time.Clock()
+    engines = {True: None if black_player == 'HUMAN' else BackgroundEngine(black_player),
+               False: None if white_player == 'HUMAN' else BackgroundEngine(white_player)}
+    thinking = None
+    next_move_time = 0.0  # time interval between moves
 
     while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                for engine in engines.values():
+                    if engine is not None:
+                        engine.shutdown()
+                pygame.display.quit()
+                return
+            if event.type == pygame.MOUSEBUTTONDOWN and game.winner() is None \
+                    and engines[game.is_black_move] is None and time() >= next_move_time:
+                new_move = human_move(event)
+                if new_move in game.valid_moves:
+                    game.make_move(new_move)
+                    next_move_time = time() + 0.5
+
+        engine = engines[game.is_black_move]
+        if game.winner() is None and engine is not None:
+            if thinking is None:
+                thinking = engine.think(game)
+                next_move_time = max(next_move_time, time() + time_interval)
+            elif thinking.done() and time() >= next_move_time:
+                new_move = engine.result(thinking)
+                thinking = None
+                if new_move in game.valid_moves:
+                    game.make_move(new_move)
+                    next_move_time = time() + 0.5
+        elif game.winner() is None and engines[not game.is_black_move] is not None:
+            # ponder the replies while the human thinks
+            engines[not game.is_black_move].ponder(game)
+
         screen.fill(THECOLORS['darkgreen'])
         draw_ui(screen)
         update_ui(screen, game)
         if player_info is not None:
             draw_player_info(screen, player_info[0], player_info[1], player_info[2])
         pygame.display.flip()  # update the screen
+        clock.tick(FRAME_RATE)
+
 
-        if game.winner() is None:
-            if game.is_black_move:
-                if black_player == 'HUMAN':
-                    event = pygame.event.wait()
-                    new_move = human_move(event)
-                else:
-                    new_move = black_player.think_move()
-                    sleep(time_interval)  # time interval between human move and computer move
-
-            else:
-                if white_player == 'HUMAN':
-                    event = pygame.event.wait()
-                    new_move = human_move(event)
-                else:
-                    new_move = white_player.think_move()
-                    sleep(time_interval)  # time interval between human move and computer move
-
-            if new_move in game.valid_moves:
-                game.make_move(new_move)
-
-                # show the last move
-                piece = WHITE_PIECE if game.is_black_move else BLACK_PIECE
-                draw_piece(screen, new_move[0], new_move[1], piece)
-                pygame.display.flip()
-                sleep(0.5)
-
-        else:
-            pygame.event.wait()
-
-
-def analysis_game(game: Reversi) -> None:
-    """Main method for the analysis mode, show the score of each possible move"""
+def analysis_game(game: Reversi, max_depth: int = 8) -> None:
+    """Main method for the analysis mode, show the score of each possible move
+    the scores are searched in a worker thread one depth after another up to
+    max_depth and shown as each depth completes, a right click takes back the
+    last move, the window is redrawn FRAME_RATE times a second"""
     screen = initialize_screen(SCREEN_SIZE, [pygame.MOUSEBUTTONDOWN])
+    clock = pygame.time.Clock()
+    analysis = BackgroundAnalysis(evaluate_score_by_piece, max_depth)
 
     while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                analysis.shutdown()
+                pygame.display.quit()
+                return
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
+                if game.move_stack:
+                    game.pop()
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                new_move = human_move(event)
+                if new_move in game.valid_moves:
+                    game.push(new_move)
+
+        analysis.analyse(game)
+        depth, scores = analysis.scores(game)
+
         screen.fill(THECOLORS['darkgreen'])
         draw_ui(screen)
         update_ui(screen, game)
-        start_time = time()
-        game_tree = generate_game_tree('*', game, 3, start_time, 99,
-                                       game.is_black_move, evaluate_score_by_piece)
-        apply_minimax(game_tree, game.is_black_move)
-        for s in game_tree.sub_trees:
-            draw_score(screen, s.move[0], s.move[1], s.score)
-
+        for move, score in scores.items():
+            draw_score(screen, move[0], move[1], score)
+        draw_text(screen, f'analysis depth: {depth}', 9.2 * UNIT, 3 * UNIT)
+        draw_text(screen, f'right click to take back', 9.2 * UNIT, 6 * UNIT)
         pygame.display.flip()  # update the screen
-
-        event = pygame.event.wait()
-        new_move = human_move(event)
-
-        if new_move in game.valid_moves:
-            game.make_move(new_move)
-
-            # show the last move
-            piece = WHITE_PIECE if game.is_black_move else BLACK_PIECE
-            draw_piece(screen, new_move[0], new_move[1], piece)
-            pygame.display.flip()
-            sleep(0.5)
+        clock.tick(FRAME_RATE)
 
 
 if __name__ == '__main__':
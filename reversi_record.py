@@ -0,0 +1,196 @@
+"""CSC111 Final Project: AI Player for Reversi
+
+Instructions:
+This Python module contains the binary format of game records, so the
+games played by the simulations can be kept and replayed later instead
+of played again.
+
+A record file is a header (magic, version) followed by the games. Each
+game is a small header (the number of moves, the winner, the final scores,
+the seed and the index of the game, the lengths of the player names), the
+names of the black and white players, and one byte row * 8 + column for
+each move. The game ends when the current player has no valid move, so
+the moves are all that is needed to replay it.
+
+GameRecordWriter appends games to a file, and read_records reads them one
+by one from a memory map, so a file of millions of games is never loaded
+into memory.
+
+Copyright and Usage Information:
+This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
+"""
+import mmap
+import os
+import struct
+from reversi_board import Reversi, SQUARES
+from reversi_bitboard import new_game
+
+MAGIC = b'RVGR'
+VERSION = 1
+HEADER = struct.Struct('<4sH')
+GAME_HEADER = struct.Struct('<BBBBqIBB')
+
+# the winners of the games by their code in the record
+RESULTS = ['TIE', 'BLACK PLAYER', 'WHITE PLAYER']
+
+
+class GameRecord:
+    """The record of one finished game
+
+    Instance Attributes:
+        - moves: the moves of the game, one byte row * 8 + column for each
+        - winner: 'BLACK PLAYER', 'WHITE PLAYER' or 'TIE'
+        - black_score: the final number of black pieces
+        - white_score: the final number of white pieces
+        - black_player: the name of the black player
+        - white_player: the name of the white player
+        - seed: the seed of the simulation
+        - index: the index of the game in the simulation
+    """
+    moves: bytes
+    winner: str
+    black_score: int
+    white_score: int
+    black_player: str
+    white_player: str
+    seed: int
+    index: int
+
+    def __init__(self, moves: bytes, winner: str, black_score: int, white_score: int,
+                 black_player: str = '', white_player: str = '',
+                 seed: int = 0, index: int = 0) -> None:
+        self.moves = bytes(moves)
+        self.winner = winner
+        self.black_score = black_score
+        self.white_score = white_score
+        self.black_player = black_player
+        self.white_player = white_player
+        self.seed = seed
+        self.index = index
+
+    @classmethod
+    def from_game(cls, game: Reversi, moves: list[tuple], black_player: str = '',
+                  white_player: str = '', seed: int = 0, index: int = 0) -> any:
+        """return the record of the finished game, whose moves from the start
+        position are moves"""
+        return cls(bytes(row * 8 + column for row, column in moves), game.winner(),
+                   game.black_score, game.white_score, black_player, white_player,
+                   seed, index)
+
+    def move_list(self) -> list[tuple]:
+        """return the moves as (row, column)"""
+        return [SQUARES[square] for square in self.moves]
+
+    def positions(self, bitboard: bool = False) -> any:
+        """yield the game after each move, from the start position to the end.
+        The same game is changed by each move, so it must be copied to be kept."""
+        game = new_game(bitboard)
+        yield game
+        for square in self.moves:
+            game.push(SQUARES[square])
+            yield game
+
+    def to_bytes(self) -> bytes:
+        """return the record in the binary format"""
+        black_name = encode_name(self.black_player)
+        white_name = encode_name(self.white_player)
+        return GAME_HEADER.pack(len(self.moves), RESULTS.index(self.winner),
+                                self.black_score, self.white_score, self.seed, self.index,
+                                len(black_name), len(white_name)) \
+            + black_name + white_name + self.moves
+
+    def __eq__(self, other: any) -> bool:
+        return isinstance(other, GameRecord) and vars(self) == vars(other)
+
+    def __repr__(self) -> str:
+        return (f'GameRecord({self.black_player!r} vs {self.white_player!r}, '
+                f'{self.winner}, {self.black_score}-{self.white_score}, {len(self.moves)} moves)')
+
+
+def encode_name(name: str) -> bytes:
+    """return name in UTF-8 cut to at most 255 bytes, without cutting a character"""
+    return name.encode()[:255].decode('utf-8', 'ignore').encode()
+
+
+class GameRecordWriter:
+    """Appends game records to a file
+
+    Instance Attributes:
+        - path: the record file
+        - count: the number of games written by this writer
+    """
+    path: str
+    count: int
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(HEADER.pack(MAGIC, VERSION))
+        else:
+            check_header(path)
+
+    def write(self, record: GameRecord) -> None:
+        """append record to the file"""
+        self._file.write(record.to_bytes())
+        self.count += 1
+
+    def flush(self) -> None:
+        """write the buffered records to the file"""
+        self._file.flush()
+
+    def close(self) -> None:
+        """close the file"""
+        self._file.close()
+
+    def __enter__(self) -> any:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def check_header(path: str) -> None:
+    """raise ValueError if path is not a record file of this version"""
+    with open(path, 'rb') as record_file:
+        magic, version = HEADER.unpack(record_file.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'{path} is not a game record file')
+
+
+def read_records(path: str) -> any:
+    """yield the records of the file one by one"""
+    check_header(path)
+    if os.path.getsize(path) == HEADER.size:
+        return
+    with open(path, 'rb') as record_file, \
+            mmap.mmap(record_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        offset = HEADER.size
+        while offset < len(data):
+            n, result, black_score, white_score, seed, index, black_length, white_length = \
+                GAME_HEADER.unpack_from(data, offset)
+            offset += GAME_HEADER.size
+            black_player = data[offset:offset + black_length].decode()
+            offset += black_length
+            white_player = data[offset:offset + white_length].decode()
+            offset += white_length
+            yield GameRecord(data[offset:offset + n], RESULTS[result], black_score, white_score,
+                             black_player, white_player, seed, index)
+            offset += n
+
+
+if __name__ == '__main__':
+    import random
+    random.seed(0)
+    with GameRecordWriter('random.games') as writer:
+        for i in range(1000):
+            r = Reversi()
+            moves = []
+            while r.winner() is None:
+                moves.append(random.choice(r.valid_moves))
+                r.make_move(moves[-1])
+            writer.write(GameRecord.from_game(r, moves, 'RandomPlayer', 'RandomPlayer', 0, i))
+    print(f'{os.path.getsize("random.games")} bytes for 1000 games')
+    positions = sum(len(record.moves) + 1 for record in read_records('random.games'))
+    print(f'{positions} positions in the file')
@@ -0,0 +1,181 @@
+"""CSC111 Final Project: AI Player for Reversi
+
+Instructions:
+This Python module contains the statistics of one search of an AI
+player: how many positions were searched and evaluated, how deep the
+search got, how often it was cut off or answered by the transposition
+table, and, if profiled, how long it spent on each part of the search.
+
+The statistics of every move can be streamed to a file as JSON lines
+with JsonLinesWriter, for example
+
+    player = MiniMaxPlayer(game, 5, 10, evaluate_score_by_position,
+                           on_statistics=JsonLinesWriter('search.jsonl'))
+
+Copyright and Usage Information:
+This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
+"""
+import json
+import time
+from reversi_board import Reversi
+
+
+class SearchStatistics:
+    """The statistics of one search
+
+    The counters are always kept. The times of the parts of the search are
+    only measured when profile is true, since timing every move and every
+    evaluation slows the search down.
+
+    Instance Attributes:
+        - search: how the move was found, 'book', 'endgame', 'minimax',
+            'alphabeta', 'iterative', 'parallel' or 'random'
+        - profile: true iff the times of the parts of the search are measured
+        - depth: the depth the search was asked for
+        - completed_depth: the deepest search completed, which is less than
+            depth if think_time ran out
+        - timed_out: true iff think_time ran out before the search of depth
+            was completed
+        - max_ply: the largest number of moves from the root to a searched position
+        - move: the move found, or None
+        - score: the score of the move, or None
+        - nodes: the number of positions searched
+        - leaves: the number of searched positions which are evaluated
+            instead of searched deeper
+        - evaluations: the number of boards given to the evaluation function,
+            including the evaluations for ordering the moves
+        - expanded: the number of searched positions whose moves are searched
+        - moves: the number of valid moves of the expanded positions
+        - cutoffs: the number of positions whose search stopped early because
+            a move was good enough (beta cutoffs)
+        - table_probes: the number of lookups in the transposition table
+        - table_hits: the number of lookups which found the position
+        - table_cutoffs: the number of positions answered by the table
+            without searching them
+        - ply: the number of moves from the root to the current position
+        - move_time: seconds spent making and undoing moves, which includes
+            finding the valid moves of the new position
+        - copy_time: seconds spent copying the game for the search
+        - evaluate_time: seconds spent in the evaluation function
+        - total_time: seconds of the whole search
+    """
+    search: str
+    profile: bool
+    depth: int
+    completed_depth: int
+    timed_out: bool
+    max_ply: int
+    move: any
+    score: any
+    nodes: int
+    leaves: int
+    evaluations: int
+    expanded: int
+    moves: int
+    cutoffs: int
+    table_probes: int
+    table_hits: int
+    table_cutoffs: int
+    ply: int
+    move_time: float
+    copy_time: float
+    evaluate_time: float
+    total_time: float
+
+    def __init__(self, search: str = '', depth: int = 0, profile: bool = False) -> None:
+        self.search = search
+        self.profile = profile
+        self.depth = depth
+        self.completed_depth = 0
+        self.timed_out = False
+        self.max_ply = 0
+        self.move = None
+        self.score = None
+        self.nodes = 0
+        self.leaves = 0
+        self.evaluations = 0
+        self.expanded = 0
+        self.moves = 0
+        self.cutoffs = 0
+        self.table_probes = 0
+        self.table_hits = 0
+        self.table_cutoffs = 0
+        self.ply = 0
+        self.move_time = 0.0
+        self.copy_time = 0.0
+        self.evaluate_time = 0.0
+        self.total_time = 0.0
+
+    def copy(self, copy: callable, time_moves: bool = True) -> Reversi:
+        """return copy(), the copy of the game for the search. If the search is
+        profiled and time_moves, the moves made on the copy by push and pop
+        are timed as well"""
+        start_time = time.perf_counter()
+        game = copy()
+        self.copy_time += time.perf_counter() - start_time
+        if self.profile and time_moves:
+            push, pop = game.push, game.pop
+
+            def timed_push(move: tuple) -> None:
+                start_time = time.perf_counter()
+                push(move)
+                self.move_time += time.perf_counter() - start_time
+
+            def timed_pop() -> tuple:
+                start_time = time.perf_counter()
+                move = pop()
+                self.move_time += time.perf_counter() - start_time
+                return move
+
+            game.push, game.pop = timed_push, timed_pop
+        return game
+
+    def timed(self, evaluate: callable) -> callable:
+        """return evaluate for the search, which adds the seconds of each
+        call to self.evaluate_time if the search is profiled"""
+        if not self.profile:
+            return evaluate
+
+        def timed_evaluate(*args) -> any:
+            start_time = time.perf_counter()
+            score = evaluate(*args)
+            self.evaluate_time += time.perf_counter() - start_time
+            return score
+        return timed_evaluate
+
+    def branching_factor(self) -> float:
+        """return the average number of valid moves of the expanded positions"""
+        return self.moves / self.expanded if self.expanded else 0.0
+
+    def nodes_per_second(self) -> float:
+        """return the number of positions searched per second"""
+        return self.nodes / self.total_time if self.total_time else 0.0
+
+    def as_dict(self) -> dict:
+        """return the statistics as a dict of numbers and strings"""
+        result = {name: value for name, value in vars(self).items() if name != 'ply'}
+        result['move'] = None if self.move is None else list(self.move)
+        result['branching_factor'] = self.branching_factor()
+        result['nodes_per_second'] = self.nodes_per_second()
+        return result
+
+    def __repr__(self) -> str:
+        return f'SearchStatistics({self.as_dict()})'
+
+
+class JsonLinesWriter:
+    """Writes the statistics of each search as one JSON line, to be used as
+    the on_statistics hook of MiniMaxPlayer
+
+    Instance Attributes:
+        - path: the file the lines are appended to
+    """
+    path: str
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def __call__(self, statistics: SearchStatistics) -> None:
+        """append statistics to the file"""
+        with open(self.path, 'a') as output_file:
+            output_file.write(json.dumps(statistics.as_dict()) + '\n')
@@ -0,0 +1,126 @@
+"""CSC111 Final Project: AI Player for Reversi
+
+Instructions:
+This Python module contains the transposition table of the alpha-beta
+search. The table remembers the searched depth, the score bound and the
+best move of positions by their Zobrist hash, so a position reached again
+by a different order of moves is not searched twice.
+
+Copyright and Usage Information:
+This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
+"""
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+REPLACEMENT_POLICIES = {'always', 'depth', 'age'}
+
+
+class TranspositionTable:
+    """A fixed-size hash table of searched positions
+
+    Each position goes to slot hash % size, the entry of a different
+    position in the slot is replaced according to the replacement policy:
+        - 'always': always replace the old entry
+        - 'depth': replace the old entry iff the new one is searched at least
+            as deep
+        - 'age': like 'depth', but entries of an older search (before the last
+            call of self.new_search) are always replaced
+
+    The table is kept in flat lists of the same size, so its memory does not
+    grow during the game and it can be shared by all moves of one game.
+
+    Instance Attributes:
+        - size: the number of slots, a power of 2
+        - replacement: the replacement policy
+        - age: the number of calls of self.new_search
+        - probes: the number of lookups
+        - hits: the number of lookups which found the position
+        - collisions: the number of lookups which found a different position
+        - stores: the number of entries stored
+        - evictions: the number of stores which replaced a different position
+    """
+    size: int
+    replacement: str
+    age: int
+    probes: int
+    hits: int
+    collisions: int
+    stores: int
+    evictions: int
+
+    def __init__(self, size: int = 1 << 18, replacement: str = 'age') -> None:
+        """Initialize the table with at least size slots"""
+        if replacement not in REPLACEMENT_POLICIES:
+            raise ValueError(f'unknown replacement policy {replacement}')
+        self.size = 1 << max(size - 1, 1).bit_length()
+        self.replacement = replacement
+        self.age = 0
+        self.keys = [None] * self.size
+        self.depths = [0] * self.size
+        self.scores = [0] * self.size
+        self.flags = [EXACT] * self.size
+        self.moves = [None] * self.size
+        self.ages = [0] * self.size
+        self.probes, self.hits, self.collisions = 0, 0, 0
+        self.stores, self.evictions = 0, 0
+
+    def new_search(self) -> None:
+        """mark the entries stored so far as old"""
+        self.age += 1
+
+    def lookup(self, key: int) -> any:
+        """return (depth, score, flag, move) of the position with hash key,
+        or None if the position is not in the table"""
+        self.probes += 1
+        i = key & (self.size - 1)
+        if self.keys[i] == key:
+            self.hits += 1
+            return self.depths[i], self.scores[i], self.flags[i], self.moves[i]
+        if self.keys[i] is not None:
+            self.collisions += 1
+        return None
+
+    def store(self, key: int, depth: int, score: float, flag: int, move: any) -> None:
+        """store the result of searching the position with hash key"""
+        i = key & (self.size - 1)
+        old_key = self.keys[i]
+        if old_key is not None and old_key != key:
+            if self.replacement == 'depth' and depth < self.depths[i]:
+                return
+            if self.replacement == 'age' and self.ages[i] == self.age \
+                    and depth < self.depths[i]:
+                return
+            self.evictions += 1
+        elif old_key == key and depth < self.depths[i] and self.ages[i] == self.age:
+            return
+        self.stores += 1
+        self.keys[i] = key
+        self.depths[i] = depth
+        self.scores[i] = score
+        self.flags[i] = flag
+        self.moves[i] = move
+        self.ages[i] = self.age
+
+    def clear(self) -> None:
+        """remove all entries and reset the statistics"""
+        self.__init__(self.size, self.replacement)
+
+    def hit_rate(self) -> float:
+        """return the fraction of lookups which found the position"""
+        return self.hits / self.probes if self.probes else 0.0
+
+    def collision_rate(self) -> float:
+        """return the fraction of lookups which found a different position"""
+        return self.collisions / self.probes if self.probes else 0.0
+
+    def statistics(self) -> dict:
+        """return the statistics of the table"""
+        return {'size': self.size,
+                'probes': self.probes,
+                'hits': self.hits,
+                'collisions': self.collisions,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'hit_rate': self.hit_rate(),
+                'collision_rate': self.collision_rate()}
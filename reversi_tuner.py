@@ -0,0 +1,213 @@
+"""CSC111 Final Project: AI Player for Reversi
+
+Instructions:
+This Python module fits the weights of evaluate_score_by_position to the
+results of recorded games (see reversi_record). The recorded games are
+replayed together with the vectorised bitboard functions of reversi_batch,
+a chunk of games at a time, and every position is turned into a feature
+vector: the piece difference of each group of symmetric squares, the
+mobility difference, and a constant.
+
+The weights are fitted by ridge least squares to the final disc difference,
+or by logistic regression to the result of the game. Only the sums
+X^T X and X^T y of each chunk are kept, so the memory does not grow with
+the number of games. The number of pieces is the sum of the square
+features, so its weight is part of the square weights.
+
+The fitted weights are written to a weight file, which reversi_player loads
+at startup when the environment variable REVERSI_WEIGHTS names it, for example
+
+    python reversi_tuner.py games.games --output weights.json
+    REVERSI_WEIGHTS=weights.json python main.py
+
+This module needs numpy.
+
+Copyright and Usage Information:
+This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
+"""
+import argparse
+import json
+import time
+import numpy as np
+from reversi_batch import find_moves_batch, find_flips_batch, count_bits, \
+    piece_difference, simulate_random_games
+from reversi_record import GameRecord, GameRecordWriter, read_records
+
+# SQUARE_CLASS[row][column] is the group of the square, the squares in a group
+# are the same square under the reflections and rotations of the board
+SQUARE_CLASS_OF = {}
+SQUARE_CLASS = [[SQUARE_CLASS_OF.setdefault(
+    (min(min(r, 7 - r), min(c, 7 - c)), max(min(r, 7 - r), min(c, 7 - c))), len(SQUARE_CLASS_OF))
+    for c in range(8)] for r in range(8)]
+CLASSES = len(SQUARE_CLASS_OF)
+
+# the (64, CLASSES) matrix which sums the squares of each group
+CLASS_MATRIX = np.zeros((64, CLASSES))
+for _square in range(64):
+    CLASS_MATRIX[_square, SQUARE_CLASS[_square // 8][_square % 8]] = 1
+
+# the features are the groups of squares, the mobility and the constant
+FEATURES = CLASSES + 2
+RESULT_VALUES = {'BLACK PLAYER': 1.0, 'WHITE PLAYER': 0.0, 'TIE': 0.5}
+
+
+def record_chunks(paths: list[str], chunk: int = 4096) -> any:
+    """yield (moves, result, disc difference) arrays of at most chunk games of
+    the record files, where moves is the (n, 60) array of the squares
+    row * 8 + column padded with -1, result is 1, 0.5 or 0 for black player,
+    and the disc difference is black minus white at the end"""
+    moves, results, discs = [], [], []
+    for path in paths:
+        for record in read_records(path):
+            row = np.full(60, -1, dtype=np.int8)
+            row[:len(record.moves)] = np.frombuffer(record.moves, dtype=np.int8)
+            moves.append(row)
+            results.append(RESULT_VALUES[record.winner])
+            discs.append(record.black_score - record.white_score)
+            if len(moves) == chunk:
+                yield np.array(moves), np.array(results), np.array(discs, dtype=np.float64)
+                moves, results, discs = [], [], []
+    if moves:
+        yield np.array(moves), np.array(results), np.array(discs, dtype=np.float64)
+
+
+def position_features(black: np.ndarray, white: np.ndarray) -> np.ndarray:
+    """return the (n, FEATURES) features of the positions of the black and
+    white bitboards, all for black player"""
+    difference = piece_difference(np.stack([black, white], axis=1)).reshape(-1, 64)
+    mobility = count_bits(find_moves_batch(black, white)).astype(np.float64) \
+        - count_bits(find_moves_batch(white, black))
+    return np.column_stack([difference @ CLASS_MATRIX, mobility, np.ones(len(black))])
+
+
+def chunk_positions(moves: np.ndarray, first_ply: int = 0) -> any:
+    """yield (game indices, features) of the positions before each move of the
+    games from ply first_ply, by replaying the games of moves together"""
+    n = len(moves)
+    black = np.full(n, (1 << 27) | (1 << 36), dtype=np.uint64)
+    white = np.full(n, (1 << 28) | (1 << 35), dtype=np.uint64)
+    for ply in range(moves.shape[1]):
+        squares = moves[:, ply]
+        playing = squares >= 0
+        if not playing.any():
+            break
+        if ply >= first_ply:
+            games = np.nonzero(playing)[0]
+            yield games, position_features(black[games], white[games])
+        # there are no passes, so black moves at the even plies
+        own, opponent = (black, white) if ply % 2 == 0 else (white, black)
+        bits = np.where(playing, np.uint64(1) << squares.astype(np.uint64), np.uint64(0))
+        flips = find_flips_batch(bits, own, opponent)
+        own, opponent = own | flips | bits, opponent ^ flips
+        black, white = (own, opponent) if ply % 2 == 0 else (opponent, own)
+
+
+def fit_least_squares(paths: list[str], first_ply: int = 0, ridge: float = 1.0,
+                      chunk: int = 4096) -> tuple[np.ndarray, int]:
+    """return the weights of the features fitted to the final disc difference
+    by ridge least squares, and the number of positions"""
+    xtx = np.zeros((FEATURES, FEATURES))
+    xty = np.zeros(FEATURES)
+    count = 0
+    for moves, _, discs in record_chunks(paths, chunk):
+        for games, x in chunk_positions(moves, first_ply):
+            xtx += x.T @ x
+            xty += x.T @ discs[games]
+            count += len(games)
+    return np.linalg.solve(xtx + ridge * np.eye(FEATURES), xty), count
+
+
+def fit_logistic(paths: list[str], first_ply: int = 0, ridge: float = 1.0,
+                 chunk: int = 4096, iterations: int = 6) -> tuple[np.ndarray, int]:
+    """return the weights of the features fitted to the results of the games
+    by logistic regression with Newton's method, one pass over the games for
+    each iteration, and the number of positions"""
+    weights = np.zeros(FEATURES)
+    count = 0
+    for _ in range(iterations):
+        gradient = -ridge * weights
+        hessian = ridge * np.eye(FEATURES)
+        count = 0
+        for moves, results, _ in record_chunks(paths, chunk):
+            for games, x in chunk_positions(moves, first_ply):
+                p = 1 / (1 + np.exp(-(x @ weights)))
+                gradient += x.T @ (results[games] - p)
+                hessian += (x * (p * (1 - p))[:, None]).T @ x
+                count += len(games)
+        weights += np.linalg.solve(hessian, gradient)
+    return weights, count
+
+
+def weight_table(weights: np.ndarray, scale: float) -> list[list[int]]:
+    """return the 8x8 integer table of the square weights times scale"""
+    return [[int(round(weights[SQUARE_CLASS[row][column]] * scale)) for column in range(8)]
+            for row in range(8)]
+
+
+def tune(paths: list[str], output: str, method: str = 'least_squares', first_ply: int = 0,
+         ridge: float = 1.0, scale: float = 10.0, chunk: int = 4096) -> dict:
+    """fit the weights to the games of the record files and write the weight file
+    output for reversi_player, return its content"""
+    start_time = time.time()
+    if method == 'least_squares':
+        weights, count = fit_least_squares(paths, first_ply, ridge, chunk)
+    elif method == 'logistic':
+        weights, count = fit_logistic(paths, first_ply, ridge, chunk)
+        # the logits are small, so they are scaled more to keep the integers apart
+        scale *= 100
+    else:
+        raise ValueError(f'unknown method {method}')
+    result = {'weight': weight_table(weights, scale),
+              'mobility': int(round(weights[CLASSES] * scale)),
+              'method': method,
+              'positions': count,
+              'seconds': time.time() - start_time}
+    with open(output, 'w') as weight_file:
+        json.dump(result, weight_file, indent=1)
+    return result
+
+
+def write_random_games(path: str, n: int, seed: int = 0, chunk: int = 100000) -> None:
+    """append n games between two random players to the record file path,
+    simulated by reversi_batch.simulate_random_games"""
+    with GameRecordWriter(path) as writer:
+        for start in range(0, n, chunk):
+            size = min(chunk, n - start)
+            games = simulate_random_games(size, seed + start, record=True)
+            for i in range(size):
+                black_score = int(games['black_score'][i])
+                white_score = int(games['white_score'][i])
+                winner = 'TIE' if black_score == white_score \
+                    else 'BLACK PLAYER' if black_score > white_score else 'WHITE PLAYER'
+                moves = games['moves'][i]
+                writer.write(GameRecord(moves[moves >= 0].astype(np.uint8).tobytes(), winner,
+                                        black_score, white_score, 'RandomPlayer',
+                                        'RandomPlayer', seed, start + i))
+
+
+def main(argv: list[str] = None) -> None:
+    """tune the weights from the command line"""
+    parser = argparse.ArgumentParser(description='Fit the weights of the position evaluation')
+    parser.add_argument('records', nargs='+', help='the game record files')
+    parser.add_argument('--output', default='weights.json', help='the weight file')
+    parser.add_argument('--method', choices=['least_squares', 'logistic'],
+                        default='least_squares')
+    parser.add_argument('--first-ply', type=int, default=0,
+                        help='the positions before this move are not used')
+    parser.add_argument('--ridge', type=float, default=1.0)
+    parser.add_argument('--scale', type=float, default=10.0,
+                        help='the integer weights are the fitted weights times scale')
+    parser.add_argument('--random-games', type=int, default=0,
+                        help='first append this many random games to the first record file')
+    args = parser.parse_args(argv)
+    if args.random_games:
+        write_random_games(args.records[0], args.random_games)
+    result = tune(args.records, args.output, args.method, args.first_ply, args.ridge, args.scale)
+    print(f'{result["positions"]} positions fitted in {result["seconds"]:.1f} seconds')
+    for row in result['weight']:
+        print(row)
+    print('mobility', result['mobility'])
+
+
+if __name__ == '__main__':
+    main()
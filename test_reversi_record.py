@@ -0,0 +1,32 @@
+"""CSC111 Final Project: AI Player for Reversi
+
+Instructions:
+This Python module contains the tests of reversi_record, run with pytest.
+
+Copyright and Usage Information:
+This file is Copyright (c) 2021 Yupeng Chang, Huiru Tan, Xi Chen.
+"""
+from reversi_board import Reversi
+from reversi_record import GameRecord, GameRecordWriter, read_records
+
+
+def test_long_non_ascii_names_round_trip(tmp_path) -> None:
+    """the names longer than 255 bytes are cut between characters,
+    so the file can still be read"""
+    game, moves = Reversi(), []
+    while game.winner() is None:
+        moves.append(game.valid_moves[0])
+        game.make_move(moves[-1])
+    record = GameRecord.from_game(game, moves, 'é' * 200, 'ab' + '€' * 100, 1, 2)
+    path = str(tmp_path / 'test.games')
+    with GameRecordWriter(path) as writer:
+        writer.write(record)
+        writer.write(record)
+    records = list(read_records(path))
+    assert len(records) == 2
+    for read in records:
+        assert read.black_player == 'é' * 127
+        assert read.white_player == 'ab' + '€' * 84
+        assert read.move_list() == moves
+        assert (read.winner, read.black_score, read.white_score, read.seed, read.index) \
+            == (record.winner, record.black_score, record.white_score, 1, 2)